@@ -5,12 +5,25 @@ from lib.color import Color  # # For managing colors
 import os  # # For file path operations
 from game_grid import GameGrid  # # For handling the game grid and tile logic
 from tetromino import Tetromino  # # For representing tetromino shapes
-import random  # # For random selection (random tetrominoes)
+from game_clock import GameClock  # # For running the game loop on fixed ticks
+from autoplayer import AutoPlayer, move_tetromino  # # For the autoplay mode
+from game_random import GameRandom  # # For the seeded random tetrominoes
+from replay import Replay  # # For recording the game
+from profiler import Profiler  # # For timing the phases of the game loop
+from capture import FrameCapture, open_sink  # # For capturing the rendered frames
+import argparse  # # For the command line options
 import time  # # For timing events like keypresses
 import sys  # # For exiting the program
 
-def start():
+def start(autoplay=False, seed=None, bag=False, record=None, profile=False, profile_dump=None, capture_path=None):
     # # Initializes the game and starts the main game loop
+    # # (with autoplay set, the autoplayer places the tetrominoes instead of the keyboard)
+    # # The tetrominoes come from a random source seeded with the given seed (the same seed
+    # # gives the same game), with bag set shapes are dealt from shuffled bags of all 7 shapes
+    # # With record set to a path, the game is saved there as a replay when it ends
+    # # With profile set, the phases of the loop and the rule steps are timed, shown in place of
+    # # the controls and dumped every 10 seconds (to the profile_dump JSON file when given)
+    # # With capture_path set, the rendered frames are written there (see capture.open_sink)
 
     # # Set basic grid and canvas settings
     grid_h, grid_w = 20, 12
@@ -24,13 +37,19 @@ def start():
     Tetromino.grid_height = grid_h
     Tetromino.grid_width = grid_w
 
-    # # Create the game grid and first two tetromino pieces
+    # # Create the game grid, the random source and first two tetromino pieces
     grid = GameGrid(grid_h, grid_w)
-    current_tetromino = create_tetromino()
-    next_tetromino = create_tetromino()
+    rng = GameRandom(seed, bag)
+    current_tetromino = create_tetromino(rng)
+    next_tetromino = create_tetromino(rng)
 
     grid.current_tetromino = current_tetromino
     grid.next_tetromino = next_tetromino
+    profiler = Profiler(profile, dump_path=profile_dump)
+    profiler.instrument(grid, ["clear_full_rows", "apply_gravity_all", "apply_merge_all"], "rules/")
+    profiler.instrument(grid, ["get_animation_states"], "animation/")
+    grid.show_controls = not profile
+    capture = FrameCapture(open_sink(capture_path)) if capture_path else None
 
     game_paused = False  # # Game pause flag
 
@@ -41,45 +60,58 @@ def start():
     score = 0  # # Initial score
     game_over = False  # # Game over flag
 
+    # # Game speed settings (gravity runs on fixed ticks, rendering at a capped frame rate)
+    gravity_interval = 0.3  # # Seconds per simulation tick (the tetromino falls one row per tick)
+    max_fps = 60  # # Maximum number of rendered frames per second
+    autoplay_interval = 1 / 60  # # Seconds per placed tetromino in autoplay mode
+
+    autoplayer = None
+    if autoplay:
+        autoplayer = AutoPlayer()
+        gravity_interval = autoplay_interval
+    # # The replay stores the seconds per tick, so it plays back at the speed it was played
+    replay = Replay(rng.seed, grid_h, grid_w, bag, tick_interval=gravity_interval) if record else None
+
     # # Display initial menu screen
     display_game_menu(grid_h, grid_w)
+    clock = GameClock(gravity_interval, max_fps)
 
     # # Main game loop
     while True:
-        if stddraw.hasNextKeyTyped():
-            key_typed = stddraw.nextKeyTyped()
-
+        profiler.tick()
+        with profiler.section("input"):
+            key_typed = stddraw.nextKeyTyped() if stddraw.hasNextKeyTyped() else None
+        if key_typed is not None:
             if key_typed == "p":
                 game_paused = not game_paused
                 time.sleep(0.2)  # # Avoid accidental multiple toggles
 
             if not game_paused:
-                if key_typed == "left":
-                    current_tetromino.move(key_typed, grid)
-                elif key_typed == "right":
-                    current_tetromino.move(key_typed, grid)
-                elif key_typed == "down":
-                    current_time = time.time()
-                    if current_time - last_down_time < down_press_interval:
-                        down_press_count += 1
-                    else:
-                        down_press_count = 1
-                    last_down_time = current_time
-
-                    if down_press_count == 2:
-                        # # Perform hard drop if down pressed twice quickly
-                        while current_tetromino.move("down", grid):
-                            pass
-                        down_press_count = 0
-                    else:
-                        current_tetromino.move("down", grid)
-
-                elif key_typed == "space":
-                    # # Hard drop on space press
-                    while current_tetromino.move("down", grid):
-                        pass
-                elif key_typed == "up":
-                    current_tetromino.rotate(grid)
+                with profiler.section("move"):
+                    if key_typed == "left":
+                        current_tetromino.move(key_typed, grid)
+                    elif key_typed == "right":
+                        current_tetromino.move(key_typed, grid)
+                    elif key_typed == "down":
+                        current_time = time.time()
+                        if current_time - last_down_time < down_press_interval:
+                            down_press_count += 1
+                        else:
+                            down_press_count = 1
+                        last_down_time = current_time
+
+                        if down_press_count == 2:
+                            # # Perform hard drop if down pressed twice quickly
+                            current_tetromino.hard_drop(grid)
+                            down_press_count = 0
+                        else:
+                            current_tetromino.move("down", grid)
+
+                    elif key_typed == "space":
+                        # # Hard drop on space press
+                        current_tetromino.hard_drop(grid)
+                    elif key_typed == "up":
+                        current_tetromino.rotate(grid)
 
             stddraw.clearKeysTyped()
 
@@ -88,34 +120,68 @@ def start():
             action = draw_pause_menu(grid.grid_width, grid.grid_height)
             if action == "resume":
                 game_paused = False
+                grid.invalidate()  # # The pause menu has cleared the canvas
+                clock.reset()  # # Do not catch up on the time spent paused
             elif action == "quit":
+                save_replay(replay, record)
+                stop_capture(capture)
                 sys.exit()
 
         else:
-            # # Move current tetromino down automatically
-            success = current_tetromino.move("down", grid)
-            if not success:
-                score += 10  # # Increase score when tetromino lands
-                tiles, pos = current_tetromino.get_min_bounded_tile_matrix(True)
-                grid.update_grid(tiles, pos)
-
-                if grid.game_over:
-                    grid.display_game_over()
-                    time.sleep(2)
-                    sys.exit()
-
-                # # Switch to the next tetromino
-                current_tetromino = next_tetromino
-                grid.current_tetromino = current_tetromino
-                next_tetromino = create_tetromino()
-                grid.next_tetromino = next_tetromino
-
-            # # Draw game elements
-            grid.display()
-            draw_score(score, grid.grid_width, grid.grid_height)
-            stddraw.show(50)
-
-def initialize_game():
+            # # Move current tetromino down automatically once per simulation tick
+            # # Ticks are numbered from 1, the batch due this frame ends at clock.tick_count
+            ticks = clock.advance()
+            for tick in range(clock.tick_count - ticks + 1, clock.tick_count + 1):
+                if autoplayer is not None:
+                    # # The autoplayer drops the tetromino at once, so it lands on this tick
+                    with profiler.section("autoplay"):
+                        placement = autoplayer.choose_tetromino_placement(grid, current_tetromino, next_tetromino)
+                        if placement is not None:
+                            move_tetromino(grid, current_tetromino, *placement)
+                with profiler.section("move"):
+                    success = current_tetromino.move("down", grid)
+                if not success:
+                    score += 10  # # Increase score when tetromino lands
+                    tiles, pos = current_tetromino.get_min_bounded_tile_matrix(True)
+                    if replay is not None:
+                        blc = current_tetromino.bottom_left_cell
+                        replay.record(tick, current_tetromino.rotation, blc.x, blc.y, grid)
+                    with profiler.section("update_grid"):
+                        grid.update_grid(tiles, pos)
+
+                    if grid.game_over:
+                        save_replay(replay, record)
+                        stop_capture(capture)
+                        if profile:
+                            profiler.dump()
+                        grid.display_game_over()
+                        time.sleep(2)
+                        sys.exit()
+
+                    # # Switch to the next tetromino
+                    current_tetromino = next_tetromino
+                    grid.current_tetromino = current_tetromino
+                    next_tetromino = create_tetromino(rng)
+                    grid.next_tetromino = next_tetromino
+
+            # # Draw game elements when a frame is due (this also polls the keyboard),
+            # # otherwise wait for the next tick or frame
+            if clock.should_render():
+                with profiler.section("display"):
+                    grid.display()
+                    draw_score(grid, score)
+                    if profile:
+                        stddraw.setPenColor(Color(0, 0, 0))
+                        profiler.draw_overlay(grid, grid.grid_width + 3.5, grid.grid_height - 13)
+                with profiler.section("show"):
+                    stddraw.show(0)
+                if capture is not None:
+                    with profiler.section("capture"):
+                        capture.grab(stddraw._surface)  # # Dropped when the writer is behind
+            else:
+                clock.wait()
+
+def initialize_game(seed=None):
     # # Sets up a fresh game state
     grid_h, grid_w = 20, 12
     canvas_w = 32 * (grid_w + 8)
@@ -128,8 +194,9 @@ def initialize_game():
     Tetromino.grid_width = grid_w
 
     grid = GameGrid(grid_h, grid_w)
-    current_tetromino = create_tetromino()
-    next_tetromino = create_tetromino()
+    rng = GameRandom(seed)
+    current_tetromino = create_tetromino(rng)
+    next_tetromino = create_tetromino(rng)
 
     grid.current_tetromino = current_tetromino
     grid.next_tetromino = next_tetromino
@@ -138,6 +205,17 @@ def initialize_game():
 
     return grid, current_tetromino, next_tetromino
 
+def save_replay(replay, path):
+    # # Writes the recorded game to the given path (when the game is recorded)
+    if replay is not None:
+        replay.save(path)
+
+def stop_capture(capture):
+    # # Writes the captured frames still queued (when the frames are captured)
+    if capture is not None:
+        capture.close()
+        print(f"{capture.captured} frames captured, {capture.dropped} dropped", file=sys.stderr)
+
 def draw_pause_menu(grid_w, grid_h):
     # # Displays a pause menu with resume and quit options
     stddraw.clear()
@@ -169,12 +247,9 @@ def draw_pause_menu(grid_w, grid_h):
             elif key == 'q':
                 return "quit"
 
-def create_tetromino():
-    # # Randomly creates and returns a new Tetromino
-    tetromino_types = ['I', 'O', 'Z', 'T', 'J', 'L', 'S']
-    random_index = random.randint(0, len(tetromino_types) - 1)
-    random_type = tetromino_types[random_index]
-    return Tetromino(random_type)
+def create_tetromino(rng):
+    # # Randomly creates and returns a new Tetromino from the random source of the game
+    return Tetromino(rng.next_shape(), rng)
 
 def display_game_menu(grid_height, grid_width):
     # # Displays the start menu screen with a button to start
@@ -208,12 +283,11 @@ def display_game_menu(grid_height, grid_width):
             if button_blc_x <= mouse_x <= button_blc_x + button_w and button_blc_y <= mouse_y <= button_blc_y + button_h:
                 break
 
-def draw_score(score, grid_w, grid_h):
-    # # Draws the current score on the side panel
+def draw_score(grid, score):
+    # # Draws the current score on the side panel (only redrawn when it changes)
     stddraw.setPenColor(Color(255, 255, 255))
     stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(16)
-    stddraw.text(grid_w + 2, grid_h - 1, f"Score: {score}")
+    grid.draw_text_region("landing_score", grid.grid_width + 2, grid.grid_height - 1, f"Score: {score}", 16, 6, 1)
 
 def draw_game_over_menu(score):
     # # Displays the Game Over screen with restart and quit options
@@ -248,4 +322,15 @@ def draw_game_over_menu(score):
 
 # # Program entry point
 if __name__ == '__main__':
-    start()
+    parser = argparse.ArgumentParser(description="Tetris 2048")
+    parser.add_argument("--autoplay", action="store_true", help="let the AI play")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the tetromino and number streams")
+    parser.add_argument("--bag", action="store_true", help="deal the shapes from shuffled bags of all 7 shapes")
+    parser.add_argument("--record", default=None, help="save the game as a replay to this file")
+    parser.add_argument("--profile", action="store_true", help="time the phases of the game loop")
+    parser.add_argument("--profile-dump", default=None, help="JSON file to dump the timings to")
+    parser.add_argument("--capture", default=None,
+                        help="write the frames as raw RGB (a file or - for stdout) or images (e.g. frames/%%05d.png)")
+    args = parser.parse_args()
+    start(autoplay=args.autoplay, seed=args.seed, bag=args.bag, record=args.record, profile=args.profile,
+          profile_dump=args.profile_dump, capture_path=args.capture)
@@ -0,0 +1,190 @@
+# Import necessary libraries
+import time  # # Used for the per-move time budget
+from collections import OrderedDict  # # Used for the LRU transposition table
+import numpy as np  # # Used for evaluating boards
+from placements import iter_placements, get_tetromino_start, get_piece_start  # # Used for the moves
+
+# # Weights of the board features in the evaluation (higher values are better)
+SCORE_WEIGHT = 0.1  # # Points gained by merges and row clears
+HEIGHT_WEIGHT = -0.5  # # Sum of the column heights
+HOLE_WEIGHT = -2.0  # # Empty cells below the top tile of their column
+BUMPINESS_WEIGHT = -0.3  # # Height differences between neighboring columns
+TILE_WEIGHT = -0.2  # # Number of tiles (fewer tiles means more merges)
+
+def evaluate_board(board):
+    # # Returns the heuristic value of a board of tile exponents
+    occupied = board != 0
+    grid_height = board.shape[0]
+    heights = np.where(occupied.any(axis=0), grid_height - occupied[::-1].argmax(axis=0), 0)
+    return evaluate_heights(heights.tolist(), int(occupied.sum()))
+
+def evaluate_heights(heights, tile_count):
+    # # Returns the heuristic value of a board given by its column heights and its number of tiles
+    height_sum = sum(heights)
+    holes = height_sum - tile_count
+    bumpiness = sum(abs(left - right) for left, right in zip(heights, heights[1:]))
+    return (HEIGHT_WEIGHT * height_sum + HOLE_WEIGHT * holes
+            + BUMPINESS_WEIGHT * bumpiness + TILE_WEIGHT * tile_count)
+
+def estimate_placement(engine, heights, tile_count, table, x, y, exponents):
+    # # Returns a cheap estimate of the value of a placement, computed from the column heights
+    # # and the row bitboards of the engine without locking the piece: the piece adds its tiles
+    # # on top of the columns, a tile landing on a tile with the same number merges once and
+    # # the rows the piece fills are cleared (further gravity and merges are not followed)
+    top_y = y + table.n - 1
+    cells = {(top_y - row, x + col): exponent for (row, col), exponent in zip(table.cells, exponents)}
+    heights = list(heights)
+    tile_count += len(cells)
+    points = 0
+    row_masks = {}
+    for (row, col), exponent in cells.items():
+        heights[col] = max(heights[col], row + 1)
+        below = cells.get((row - 1, col))
+        if below is None and row > 0:
+            below = engine.board[row - 1, col]
+        if below == exponent:
+            points += 1 << (exponent + 1)
+            tile_count -= 1
+        row_masks[row] = row_masks.get(row, 0) | 1 << col
+
+    full_mask = (1 << engine.grid_width) - 1
+    for row, mask in row_masks.items():
+        if engine.row_bits[row] | mask == full_mask:
+            points += int(np.left_shift(1, engine.board[row].astype(np.int64)).sum())
+            tile_count -= engine.grid_width
+            heights = [max(height - 1, 0) for height in heights]
+    return evaluate_heights(heights, tile_count) + SCORE_WEIGHT * points
+
+def get_board_key(engine):
+    # # Returns the key of a board in the transposition table (its Zobrist hash)
+    return engine.state_hash
+
+def get_piece_key(start):
+    # # Returns the key of a piece at its start position: (shape tables, exponents, x, y, rotation)
+    rotation_tables, exponents, x, y, rotation = start
+    return id(rotation_tables), tuple(exponents), x, y, rotation
+
+# # Picks placements by searching over the current and the next piece: every placement of the
+# # current piece is evaluated first, then the best ones are refined with the best placement of
+# # the next piece for as long as the time budget of the move allows
+# # Locking a piece (row clears, gravity and merges) is by far the most expensive step, so every
+# # placement is first estimated from the heights and the bitboards and only the exact_count
+# # best estimates are locked; this keeps an expansion at a few locks, so the refinements with
+# # the next piece fit into the budget
+class AutoPlayer:
+    def __init__(self, time_budget=0.012, cache_size=20000, exact_count=4):
+        self.time_budget = time_budget  # # Seconds of search per move
+        self.cache_size = cache_size  # # Maximum number of positions in the transposition table
+        self.exact_count = exact_count  # # Placements per expansion that are locked and evaluated exactly
+        # # Transposition table: (board hash, piece key) -> placements of the piece on the board
+        # # as (value, rotation, column, landing_y), best first, evicted least recently used
+        self.cache = OrderedDict()
+        self.last_depth = 0  # # Number of pieces searched for the last move (1 or 2)
+
+    def expand(self, engine, start, deadline=None, results=None):
+        # # Returns the placements of a piece on a board sorted by their value, where the value
+        # # is the evaluation of the resulting board plus the weighted points gained (exact for
+        # # the exact_count best estimated placements, estimated for the others)
+        # # When the deadline passes, the placements not locked yet keep their estimates (at least
+        # # one is locked, and they are not cached, since the exact values may be better)
+        # # The engines of the locked placements are added to results (keyed by (rotation, column))
+        # # when it is given, so they do not have to be locked again
+        key = (get_board_key(engine), get_piece_key(start))
+        placements = self.cache.get(key)
+        if placements is not None:
+            self.cache.move_to_end(key)
+            return placements
+
+        rotation_tables, exponents = start[0], start[1]
+        heights = [bits.bit_length() for bits in engine.col_bits]
+        tile_count = sum(bin(bits).count("1") for bits in engine.row_bits)
+        candidates = [(estimate_placement(engine, heights, tile_count, rotation_tables[rotation], column, landing_y,
+                                          exponents), rotation, column, landing_y)
+                      for rotation, column, landing_y in iter_placements(engine, *start)]
+        candidates.sort(key=lambda placement: placement[0], reverse=True)
+
+        placements = []
+        complete = True
+        for index, (estimate, rotation, column, landing_y) in enumerate(candidates):
+            if index >= self.exact_count:
+                placements.append((estimate, rotation, column, landing_y))
+                continue
+            if placements and deadline is not None and time.perf_counter() > deadline:
+                complete = False
+                placements.extend(candidates[index:])
+                break
+            result = engine.copy()
+            result.lock_piece(rotation_tables[rotation], column, landing_y, exponents)
+            if result.game_over:
+                value = float("-inf")
+            else:
+                value = evaluate_board(result.board) + SCORE_WEIGHT * (result.score - engine.score)
+            placements.append((value, rotation, column, landing_y))
+            if results is not None:
+                results[(rotation, column)] = result
+        placements.sort(key=lambda placement: placement[0], reverse=True)
+
+        if complete:
+            self.cache[key] = placements
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return placements
+
+    def choose(self, engine, start, next_start=None):
+        # # Returns the (rotation, column) to place the piece given by its start (see
+        # # placements.get_tetromino_start) at, or None when the piece cannot be placed
+        # # The budget covers the whole move: both expansions stop when the deadline passes
+        deadline = time.perf_counter() + self.time_budget
+        results = {}
+        placements = self.expand(engine, start, deadline, results)
+        if not placements:
+            return None
+        self.last_depth = 1
+        best_value, best_rotation, best_column, _ = placements[0]
+        if next_start is None:
+            return best_rotation, best_column
+
+        # # Refine the placements in the order of their own value while there is time left,
+        # # the best refined placement is chosen (or the best unrefined one if none was refined)
+        rotation_tables, exponents = start[0], start[1]
+        best = None
+        for value, rotation, column, landing_y in placements:
+            if time.perf_counter() > deadline or value == float("-inf"):
+                break
+            result = results.get((rotation, column))
+            if result is None:
+                result = engine.copy()
+                result.lock_piece(rotation_tables[rotation], column, landing_y, exponents)
+            next_placements = self.expand(result, next_start, deadline)
+            if not next_placements:
+                continue
+            total = SCORE_WEIGHT * (result.score - engine.score) + next_placements[0][0]
+            if best is None or total > best[0]:
+                best = (total, rotation, column)
+
+        if best is None:
+            return best_rotation, best_column
+        self.last_depth = 2
+        return best[1], best[2]
+
+    def choose_tetromino_placement(self, grid, tetromino, next_tetromino=None):
+        # # Returns the (rotation, column) for a Tetromino on a GameGrid
+        next_start = get_tetromino_start(next_tetromino) if next_tetromino is not None else None
+        return self.choose(grid, get_tetromino_start(tetromino), next_start)
+
+    def choose_piece_placement(self, game):
+        # # Returns the (rotation, column) for the current piece of a HeadlessGame
+        engine = game.engine
+        return self.choose(engine, get_piece_start(engine, game.current_piece),
+                           get_piece_start(engine, game.next_piece))
+
+def move_tetromino(grid, tetromino, rotation, column):
+    # # Rotates and moves a Tetromino to the given placement and drops it (the moves
+    # # of the placement enumerator, so the placement is always reachable)
+    while tetromino.rotation != rotation:
+        tetromino.rotate(grid)
+    while tetromino.bottom_left_cell.x > column and tetromino.move("left", grid):
+        pass
+    while tetromino.bottom_left_cell.x < column and tetromino.move("right", grid):
+        pass
+    tetromino.hard_drop(grid)
@@ -0,0 +1,294 @@
+# Import necessary libraries
+import numpy as np  # # Used for storing and updating all boards as one array
+from shapes import SHAPE_TYPES, ROTATION_TABLES  # # Used for the tetromino shapes
+
+def build_shape_arrays():
+    # # Builds array versions of the rotation tables indexed by [shape index, rotation]
+    # # (shape index = position in SHAPE_TYPES): the matrix row and column of each tile,
+    # # the matrix size and the first and last occupied columns
+    cell_rows = np.zeros((len(SHAPE_TYPES), 4, 4), dtype=np.int64)
+    cell_cols = np.zeros((len(SHAPE_TYPES), 4, 4), dtype=np.int64)
+    sizes = np.zeros(len(SHAPE_TYPES), dtype=np.int64)
+    min_cols = np.zeros((len(SHAPE_TYPES), 4), dtype=np.int64)
+    max_cols = np.zeros((len(SHAPE_TYPES), 4), dtype=np.int64)
+    for shape_index, shape in enumerate(SHAPE_TYPES):
+        for rotation, table in enumerate(ROTATION_TABLES[shape]):
+            cell_rows[shape_index, rotation] = [row for row, _ in table.cells]
+            cell_cols[shape_index, rotation] = [col for _, col in table.cells]
+            min_cols[shape_index, rotation] = table.min_col
+            max_cols[shape_index, rotation] = table.max_col
+            sizes[shape_index] = table.n
+    return cell_rows, cell_cols, sizes, min_cols, max_cols
+
+CELL_ROWS, CELL_COLS, SHAPE_SIZES, MIN_COLS, MAX_COLS = build_shape_arrays()
+
+def row_bits(occupied):
+    # # Returns the rows of (n, h, w) occupancy masks as (n, h) numbers with one bit per column
+    # # (a float matrix product is much faster than an integer one and exact up to 53 bits)
+    return (occupied.astype(np.float64) @ np.ldexp(1.0, np.arange(occupied.shape[2]))).astype(np.int64)
+
+def column_bits(occupied):
+    # # Returns the columns of (n, h, w) occupancy masks as (n, w) floats with one bit per row
+    return np.ldexp(1.0, np.arange(occupied.shape[1])) @ occupied.astype(np.float64)
+
+def column_heights(occupied):
+    # # Returns the column heights of (n, h, w) occupancy masks (1 + row of the highest tile, 0 for
+    # # empty columns): the binary exponent of each column read as a number with one bit per row
+    return np.frexp(column_bits(occupied))[1]
+
+def accumulate_rows(ufunc, array):
+    # # Accumulates a rows-first (h, ...) array up its rows in place, one row at a time (much
+    # # faster than ufunc.accumulate along the middle axis of the (n, h, w) layout)
+    for row in range(1, len(array)):
+        ufunc(array[row], array[row - 1], out=array[row])
+    return array
+
+# # Rules engine stepping many games in lockstep: the B boards are stored as one (B, h, w)
+# # array of tile exponents (as in GridEngine) and every rule runs as array operations over
+# # the whole batch instead of B separate GridEngine objects
+class BatchGridEngine:
+    def __init__(self, batch_size, grid_h, grid_w):
+        self.batch_size = batch_size
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.boards = np.zeros((batch_size, grid_h, grid_w), dtype=np.uint8)
+        self.scores = np.zeros(batch_size, dtype=np.int64)
+        self.game_over = np.zeros(batch_size, dtype=bool)
+        self.pieces_placed = np.zeros(batch_size, dtype=np.int64)
+        self.lines_cleared = np.zeros(batch_size, dtype=np.int64)
+        self.merge_count = np.zeros(batch_size, dtype=np.int64)
+        # # Dirty regions: lowest changed row of each board that gravity has to settle from
+        # # (as GridEngine.gravity_from_row, the rows below it are settled)
+        self.gravity_from_rows = np.full(batch_size, grid_h)
+
+    def reset(self, mask=None):
+        # # Clears the games selected by the boolean mask (all games when no mask is given)
+        if mask is None:
+            mask = np.ones(self.batch_size, dtype=bool)
+        self.boards[mask] = 0
+        for counter in (self.scores, self.game_over, self.pieces_placed, self.lines_cleared, self.merge_count):
+            counter[mask] = 0
+        self.gravity_from_rows[mask] = self.grid_height
+
+    def mark_all_dirty(self, mask=None):
+        # # Marks the boards selected by the boolean mask (all boards when no mask is given) as
+        # # changed, e.g. after assigning them directly
+        if mask is None:
+            mask = np.ones(self.batch_size, dtype=bool)
+        self.gravity_from_rows[mask] = 0
+
+    def get_heights(self):
+        # # Returns the (B, w) column heights (1 + row of the highest tile, 0 for empty columns)
+        return column_heights(self.boards != 0)
+
+    def random_placements(self, rng):
+        # # Returns random shapes, rotations, columns and tile exponents (2 or 4) for all games
+        shapes = rng.integers(0, len(SHAPE_TYPES), self.batch_size)
+        rotations = rng.integers(0, 4, self.batch_size)
+        min_cols, max_cols = MIN_COLS[shapes, rotations], MAX_COLS[shapes, rotations]
+        columns = rng.integers(-min_cols, self.grid_width - max_cols)
+        exponents = rng.integers(1, 3, (self.batch_size, 4)).astype(np.uint8)
+        return shapes, rotations, columns, exponents
+
+    def place(self, shapes, rotations, columns, exponents):
+        # # Drops one tetromino straight down on each board and settles all boards
+        # # shapes: shape indexes (in SHAPE_TYPES), rotations: 0-3, columns: x of the bottom left
+        # # cell of the tile matrix (as Tetromino.bottom_left_cell.x), exponents: (B, 4) tile
+        # # exponents in the order of the rotation table cells; finished games are skipped
+        batch = np.arange(self.batch_size)[:, None]
+        active = ~self.game_over
+        cell_offsets = SHAPE_SIZES[shapes][:, None] - 1 - CELL_ROWS[shapes, rotations]  # # Height above the matrix bottom
+        cell_cols = CELL_COLS[shapes, rotations] + columns[:, None]
+
+        # # Each piece lands where its lowest cell in some column touches that column's stack
+        heights = self.get_heights()
+        landing_y = (heights[batch, cell_cols] - cell_offsets).max(axis=1)
+        cell_rows = landing_y[:, None] + cell_offsets
+
+        # # A tile locked above the grid ends the game: as in GridEngine.lock_cells, the tiles
+        # # before it (in the order of the rotation table cells) are locked and the board is
+        # # not settled
+        above = cell_rows >= self.grid_height
+        overflow = active & above.any(axis=1)
+        self.game_over |= overflow
+        lock = active & ~overflow
+        locked_cells = active[:, None] & (np.cumsum(above, axis=1) == 0)
+        self.boards[np.broadcast_to(batch, locked_cells.shape)[locked_cells], cell_rows[locked_cells],
+                    cell_cols[locked_cells]] = exponents[locked_cells]
+        self.pieces_placed += lock
+        np.minimum(self.gravity_from_rows, np.where(lock, cell_rows.min(axis=1), self.grid_height),
+                   out=self.gravity_from_rows)
+
+        # # Row clears, then gravity and merges alternate only on the boards that are still changing
+        pending = np.flatnonzero(lock)
+        self.clear_full_rows(pending)
+        while pending.size:
+            self.apply_gravity_all(pending)
+            pending = pending[self.apply_merge_all(pending)]
+
+        # # The game is over when any column is filled up to the top
+        self.game_over |= (column_bits(self.boards != 0) == 2.0 ** self.grid_height - 1).any(axis=1)
+        return lock
+
+    def clear_full_rows(self, indexes=None):
+        # # Clears the full rows of many boards and compacts the rows above them downward
+        # # indexes: the boards to clear (all boards when not given); returns the number of rows
+        # # cleared on each of them
+        if indexes is None:
+            indexes = np.arange(self.batch_size)
+        full_rows = row_bits(self.boards[indexes] != 0) == (1 << self.grid_width) - 1
+        cleared = full_rows.sum(axis=1)
+        if not cleared.any():
+            return cleared
+        all_cleared = cleared
+        clearing = cleared > 0
+        indexes, full_rows, cleared = indexes[clearing], full_rows[clearing], cleared[clearing]
+        boards = self.boards[indexes]
+
+        # # Points are awarded for each cleared row (the sum of all numbers in the row)
+        numbers = np.left_shift(1, boards.astype(np.int64))
+        self.scores[indexes] += (numbers * full_rows[:, :, None]).sum(axis=(1, 2))
+        self.lines_cleared[indexes] += cleared
+        lowest_cleared = np.argmax(full_rows, axis=1)
+        self.gravity_from_rows[indexes] = np.minimum(self.gravity_from_rows[indexes], lowest_cleared)
+
+        # # A stable sort on the full flags moves the remaining rows down in their order
+        order = np.argsort(full_rows, axis=1, kind="stable")
+        boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+        boards[np.arange(self.grid_height)[None, :] >= (self.grid_height - cleared)[:, None]] = 0
+        self.boards[indexes] = boards
+        return all_cleared
+
+    def apply_gravity_all(self, indexes=None):
+        # # Settles the connected components (horizontal runs) of many boards with the same landing
+        # # rule as GridEngine.apply_gravity_all, for all rows at once: a run lands one row above
+        # # the highest tile below it in its columns, or next to the highest tile below it in the
+        # # columns beside it (falling components stick to their side neighbors), where the tiles
+        # # below are at their landing rows too
+        # # indexes: the boards to settle (all boards when not given); returns which of them changed
+        if indexes is None:
+            indexes = np.arange(self.batch_size)
+        from_rows = self.gravity_from_rows[indexes]
+        self.gravity_from_rows[indexes] = self.grid_height
+        changed = np.zeros(len(indexes), dtype=bool)
+
+        # # A board only changes if a run above its dirty row rests on no tile. On the row bitboards,
+        # # adding the tiles that have a tile below them to their row carries through each run from
+        # # its lowest such tile up to its top bit, so the runs whose top bit is not reached fall
+        dirty = np.flatnonzero(from_rows < self.grid_height)
+        occupied = self.boards[indexes[dirty]] != 0
+        bits = row_bits(occupied)
+        supported = bits.copy()
+        supported[:, 1:] &= bits[:, :-1]
+        reached = (bits & ~(bits + supported)) | supported
+        falling_rows = (bits & ~(bits >> 1) & ~reached) != 0
+        falling_rows &= np.arange(self.grid_height)[None, :] >= from_rows[dirty, None]
+        moving = falling_rows.any(axis=1)
+        if not moving.any():
+            return changed
+        changed[dirty[moving]] = True
+        indexes, from_rows, occupied = indexes[dirty[moving]], from_rows[dirty[moving]], occupied[moving]
+        boards = self.boards[indexes]
+
+        # # Only the tiles from the dirty row up can fall. Each tile lands below its row, stacked on
+        # # the tiles under it (gravity keeps the order of the tiles in a column), so the landing
+        # # rows start at the rows of the tiles and are lowered until they are stable: each pass
+        # # stacks the tiles of every column with a cumulative max and takes the max over each run
+        # # (boards drop out of the passes once they are stable)
+        unsettled = occupied & (np.arange(self.grid_height)[None, :, None] >= from_rows[:, None, None])
+        settled = occupied & ~unsettled
+        run_starts = unsettled.copy()  # # A run is unsettled as a whole, the dirty region is made of rows
+        run_starts[:, :, 1:] &= ~unsettled[:, :, :-1]
+        cells = np.flatnonzero(unsettled)  # # Runs are contiguous in row-major order
+        cell_starts = run_starts.ravel()[cells]
+        cell_boards, cells = np.divmod(cells, self.grid_height * self.grid_width)
+        cell_rows, cell_cols = np.divmod(cells, self.grid_width)
+        settled_height = column_heights(settled)
+        # # Row of each tile when the tiles of its column are stacked on the settled ones
+        ranks = accumulate_rows(np.add, unsettled.transpose(1, 0, 2).astype(np.int16, order="C"))
+        stack_rows = (ranks[cell_rows, cell_boards, cell_cols] - 1
+                      + settled_height[cell_boards, cell_cols]).astype(np.int16)
+        cell_landing = cell_rows.astype(np.int16)
+
+        # # Per pass, over the boards that are not stable yet (rows first): how far each tile is
+        # # above its stacked row and the landing row of each tile, with an empty column on both sides
+        offsets = np.full((self.grid_height, len(indexes), self.grid_width), -self.grid_height, dtype=np.int16)
+        landing = np.full((self.grid_height, len(indexes), self.grid_width + 2), -1, dtype=np.int16)
+        heights = np.arange(1, self.grid_height + 1, dtype=np.int16)[:, None, None]
+        landing[:, :, 1:-1] += settled.transpose(1, 0, 2) * heights
+        below = np.full((self.grid_height + 1, len(indexes), self.grid_width + 2), -1, dtype=np.int16)
+        cells, slots = np.arange(len(cell_boards)), cell_boards  # # Cells and their boards in the pass arrays
+        while True:
+            rows, cols = cell_rows[cells], cell_cols[cells]
+            offsets[rows, slots, cols] = cell_landing[cells] - stack_rows[cells]
+            landing[rows, slots, cols + 1] = cell_landing[cells]
+            # # Highest landing row below each cell (row 0 of below is under the grid)
+            below[1:] = landing
+            accumulate_rows(np.maximum, below[1:])
+            # # A tile stacks on the tile below it in its column and sticks to the columns beside it
+            stacked = accumulate_rows(np.maximum, offsets.copy())
+            own = np.maximum(stacked[rows - 1, slots, cols], 0) + stack_rows[cells]
+            own[rows == 0] = 0
+            candidates = np.maximum(own, np.maximum(below[rows, slots, cols], below[rows, slots, cols + 2]))
+            pass_starts = cell_starts[cells]
+            new_landing = np.maximum.reduceat(candidates, np.flatnonzero(pass_starts))[np.cumsum(pass_starts) - 1]
+            lowered = new_landing != cell_landing[cells]
+            if not lowered.any():
+                break
+            cell_landing[cells] = new_landing
+            unstable = np.zeros(offsets.shape[1], dtype=bool)
+            unstable[slots[lowered]] = True
+            if 2 * unstable.sum() > len(unstable):
+                continue  # # Compacting only pays off once half of the boards are stable
+            keep = unstable[slots]
+            cells, slots = cells[keep], (np.cumsum(unstable) - 1)[slots[keep]]
+            offsets, landing, below = offsets[:, unstable], landing[:, unstable], below[:, unstable]
+
+        boards[cell_boards, cell_rows, cell_cols] = 0
+        boards[cell_boards, cell_landing, cell_cols] = self.boards[indexes[cell_boards], cell_rows, cell_cols]
+        self.boards[indexes] = boards
+        return changed
+
+    def apply_merge_all(self, indexes=None):
+        # # Merges vertically adjacent equal tiles of many boards at once, pairing them bottom-up
+        # # as GridEngine.apply_merge_all does (in a column of equal tiles the 1st and 2nd merge,
+        # # then the 3rd and 4th, ...)
+        # # indexes: the boards to merge (all boards when not given); returns which of them changed
+        if indexes is None:
+            indexes = np.arange(self.batch_size)
+        boards = self.boards[indexes]
+        lower, upper = boards[:, :-1], boards[:, 1:]
+        equal = (lower == upper) & (lower != 0)
+        merged = equal.any(axis=(1, 2))
+        if not merged.any():
+            return merged
+
+        # # Only the boards with equal neighbors take part in the pairing
+        indexes, boards, equal = indexes[merged], boards[merged], equal[merged]
+        merging = equal
+        chains = (equal[:, 1:] & equal[:, :-1]).any(axis=(1, 2))  # # Three or more equal tiles in a column
+        if chains.any():
+            chain_equal = equal[chains].transpose(1, 0, 2).copy()  # # Rows first
+            count = accumulate_rows(np.add, chain_equal.astype(np.int16))
+            run_position = count - accumulate_rows(np.maximum, np.where(chain_equal, 0, count))
+            merging = equal.copy()
+            merging[chains] &= (run_position % 2 == 1).transpose(1, 0, 2)
+
+        # # Merged pairs by board, then row (the first one of each board is its lowest)
+        pairs = np.flatnonzero(merging)
+        pair_boards, pairs = np.divmod(pairs, (self.grid_height - 1) * self.grid_width)
+        lower = pair_boards * self.grid_height * self.grid_width + pairs  # # Lower tiles in boards.ravel()
+        tiles = boards.reshape(-1)
+        merged_exponents = tiles[lower].astype(np.int64) + 1
+        self.scores[indexes] += np.bincount(pair_boards, weights=np.left_shift(1, merged_exponents),
+                                            minlength=len(indexes)).astype(np.int64)
+        self.merge_count[indexes] += np.bincount(pair_boards, minlength=len(indexes))
+        # # The tiles above a merged pair may fall into the gap
+        first = np.ones(len(pair_boards), dtype=bool)
+        first[1:] = pair_boards[1:] != pair_boards[:-1]
+        lowest_merged = pairs[first] // self.grid_width
+        self.gravity_from_rows[indexes] = np.minimum(self.gravity_from_rows[indexes], lowest_merged + 1)
+        tiles[lower] += 1
+        tiles[lower + self.grid_width] = 0
+        self.boards[indexes] = boards
+        return merged
@@ -0,0 +1,249 @@
+# Import necessary libraries
+import argparse  # # For reading the command line options
+import json  # # For saving and comparing the results
+import platform  # # For recording the machine the results come from
+import random  # # For the random policy of the game benchmark
+import time  # # For timing the operations
+import numpy as np  # # For building the synthetic boards
+from grid_engine import GridEngine  # # For the rules benchmarks
+from headless_game import HeadlessGame  # # For the whole game benchmark
+from shapes import ROTATION_TABLES  # # For locking pieces without Tetromino objects
+
+# # Micro benchmarks time a single operation on a synthetic board, macro benchmarks time whole
+# # games; every benchmark builds its state once and returns (setup, operation) where setup
+# # gives a fresh copy of the state for each run and only the operation is timed
+BENCHMARKS = {}
+
+def benchmark(name):
+    # # Registers a benchmark under the given name
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+def settle(engine):
+    # # Settles a board assigned directly (row clears, gravity and merges) and returns the engine
+    engine.mark_all_dirty()
+    engine.lock_cells([])
+    return engine
+
+def make_half_full_board(grid_h=20, grid_w=12, seed=0):
+    # # Returns a settled engine with the lower half of the board filled by random tiles,
+    # # one hole per row so that no row is cleared
+    rng = np.random.default_rng(seed)
+    engine = GridEngine(grid_h, grid_w)
+    engine.board[:grid_h // 2] = rng.integers(1, 11, (grid_h // 2, grid_w))
+    engine.board[np.arange(grid_h // 2), rng.integers(0, grid_w, grid_h // 2)] = 0
+    return settle(engine)
+
+def make_cascade_board(grid_h=20, grid_w=12):
+    # # Returns an engine with a stack of 2^9, 2^8, ..., 2 in every column but the last one,
+    # # so a 2 locked on top of a stack merges all the way down
+    engine = GridEngine(grid_h, grid_w)
+    engine.board[:9, :grid_w - 1] = np.arange(9, 0, -1)[:, None]
+    engine.mark_all_dirty()
+    return engine
+
+def make_multi_line_board(grid_h=20, grid_w=12):
+    # # Returns an engine with the four bottom rows filled except the first column, with
+    # # alternating 2s and 4s so that no tiles merge (a vertical I piece clears all four rows)
+    engine = GridEngine(grid_h, grid_w)
+    rows, cols = np.indices((4, grid_w - 1))
+    engine.board[:4, 1:] = 1 + (rows + cols) % 2
+    engine.mark_all_dirty()
+    return engine
+
+def make_fragmented_board(grid_h=20, grid_w=12):
+    # # Returns an unsettled engine with single floating tiles on every other row and column,
+    # # the worst case for gravity (every tile is its own component and has to fall)
+    engine = GridEngine(grid_h, grid_w)
+    rows, cols = np.indices((grid_h, grid_w))
+    floating = (rows % 2 == 1) & ((rows // 2 + cols) % 2 == 0)
+    engine.board[floating] = (1 + (rows + cols) % 3)[floating]
+    engine.mark_all_dirty()
+    return engine
+
+def lock_benchmark(engine, shape, rotation, x, y, exponents):
+    # # Returns a benchmark locking a piece on copies of the given engine (the rules path of
+    # # GameGrid.update_grid: lock, row clears, gravity and merges)
+    table = ROTATION_TABLES[shape][rotation]
+    return engine.copy, lambda copy: copy.lock_piece(table, x, y, exponents)
+
+@benchmark("update_grid/empty")
+def bench_update_grid_empty():
+    return lock_benchmark(GridEngine(20, 12), 'T', 0, 4, 0, [1, 2, 1, 2])
+
+@benchmark("update_grid/half_full")
+def bench_update_grid_half_full():
+    engine = make_half_full_board()
+    table = ROTATION_TABLES['T'][0]
+    y = 17 - engine.drop_distance(table, 4, 17)
+    return lock_benchmark(engine, 'T', 0, 4, y, [1, 2, 1, 2])
+
+@benchmark("update_grid/merge_cascade")
+def bench_update_grid_merge_cascade():
+    # # A horizontal I piece of 2s on top of four stacks (in row 9, it is in row 1 of its matrix)
+    return lock_benchmark(make_cascade_board(), 'I', 1, 0, 7, [1, 1, 1, 1])
+
+@benchmark("update_grid/multi_line_clear")
+def bench_update_grid_multi_line_clear():
+    # # A vertical I piece in the first column (it is in column 1 of its matrix)
+    return lock_benchmark(make_multi_line_board(), 'I', 0, -1, 0, [1, 2, 1, 2])
+
+@benchmark("apply_gravity_all/fragmented")
+def bench_apply_gravity_fragmented():
+    return make_fragmented_board().copy, lambda copy: copy.apply_gravity_all()
+
+def tetromino_benchmark(operation):
+    # # Returns a benchmark of a Tetromino operation on a half-full board
+    import offscreen  # # Needs pygame, the tiles of the tetromino import stddraw
+    offscreen.install()
+    from tetromino import Tetromino
+    from game_random import GameRandom
+    Tetromino.grid_height, Tetromino.grid_width = 20, 12
+    engine = make_half_full_board()
+    tetromino = Tetromino('T', GameRandom(0))
+    position = (tetromino.bottom_left_cell.x, tetromino.bottom_left_cell.y)
+
+    def setup():
+        tetromino.bottom_left_cell.x, tetromino.bottom_left_cell.y = position
+        tetromino.rotation = 0
+        return tetromino
+    return setup, lambda copy: operation(copy, engine)
+
+@benchmark("tetromino/can_be_moved")
+def bench_can_be_moved():
+    return tetromino_benchmark(lambda tetromino, grid: tetromino.can_be_moved("down", grid))
+
+@benchmark("tetromino/rotate")
+def bench_rotate():
+    return tetromino_benchmark(lambda tetromino, grid: tetromino.rotate(grid))
+
+@benchmark("tetromino/hard_drop")
+def bench_hard_drop():
+    return tetromino_benchmark(lambda tetromino, grid: tetromino.hard_drop(grid))
+
+@benchmark("display/full_redraw")
+def bench_display_full():
+    # # GameGrid.display on a half-full board after the cached background is dropped
+    grid = make_display_grid()
+    def setup():
+        grid.invalidate()
+        return grid
+    return setup, lambda copy: copy.display()
+
+@benchmark("display/one_lock")
+def bench_display_one_lock():
+    # # GameGrid.display after a piece is locked (only the changed cells are redrawn)
+    grid = make_display_grid()
+    grid.display()
+    drawn = grid.board.copy()
+    def setup():
+        grid.board[:] = drawn
+        grid.display()
+        grid.board[18:20, 0:2] = 1 + np.arange(2)[:, None]
+        return grid
+    return setup, lambda copy: copy.display()
+
+def make_display_grid():
+    # # Returns a GameGrid with a half-full board drawn on an offscreen canvas
+    import offscreen  # # Needs pygame
+    offscreen.install()
+    import lib.stddraw as stddraw
+    from game_grid import GameGrid
+    stddraw.setCanvasSize(32 * 20, 32 * 20)
+    stddraw.setXscale(-0.5, 19.5)
+    stddraw.setYscale(-0.5, 19.5)
+    grid = GameGrid(20, 12, animations=False)
+    grid.board[:] = make_half_full_board().board
+    grid.mark_all_dirty()
+    return grid
+
+@benchmark("game/random_policy")
+def bench_game_random_policy():
+    # # A whole headless game placing random reachable pieces (at most 500)
+    def play(game):
+        rng = random.Random(0)
+        while not game.game_over and game.pieces_placed < 500:
+            game.place(*rng.choice(game.get_legal_placements()))
+    return lambda: HeadlessGame(seed=0), play
+
+def run_benchmark(function, min_time=0.2, repeat=5):
+    # # Times a benchmark, repeat rounds of at least min_time seconds each
+    # # Returns the median and the minimum seconds per operation over the rounds and the runs per round
+    setup, operation = function()
+    operation(setup())  # # Warm up the caches (sprites, tables, ...)
+    runs = 1
+    while True:
+        elapsed = time_runs(setup, operation, runs)
+        if elapsed >= min_time / 10 or runs >= 1 << 20:
+            break
+        runs *= 10
+    runs = max(1, int(runs * min_time / max(elapsed, 1e-9)))
+    rounds = [time_runs(setup, operation, runs) / runs for _ in range(repeat)]
+    return float(np.median(rounds)), min(rounds), runs
+
+def time_runs(setup, operation, runs):
+    # # Returns the seconds spent in the operation over the given number of runs (setup excluded)
+    elapsed = 0.0
+    for _ in range(runs):
+        state = setup()
+        start_time = time.perf_counter()
+        operation(state)
+        elapsed += time.perf_counter() - start_time
+    return elapsed
+
+def run_all(names, min_time=0.2, repeat=5):
+    # # Runs the given benchmarks, those whose dependencies are missing are skipped
+    # # Returns the results as a dict of name -> {median_us, min_us, runs}
+    results = {}
+    for name in names:
+        try:
+            median, minimum, runs = run_benchmark(BENCHMARKS[name], min_time, repeat)
+        except ImportError as error:
+            print(f"{name:32} skipped ({error})")
+            continue
+        results[name] = {"median_us": median * 1e6, "min_us": minimum * 1e6, "runs": runs}
+        print(f"{name:32} {median * 1e6:12.2f} us  (min {minimum * 1e6:.2f} us, {runs} runs)")
+    return results
+
+def find_regressions(results, baseline, tolerance):
+    # # Returns (name, baseline, current) for the benchmarks more than tolerance slower than
+    # # in the baseline (compared on the median time per operation)
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            old, new = baseline[name]["median_us"], result["median_us"]
+            if new > old * (1 + tolerance):
+                regressions.append((name, old, new))
+    return regressions
+
+def main():
+    # # Command line entry point of the benchmark suite
+    parser = argparse.ArgumentParser(description="Benchmark the Tetris 2048 rules engine and renderer")
+    parser.add_argument("--filter", default="", help="only run the benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per benchmark")
+    parser.add_argument("--output", default="benchmark.json", help="file to save the results to (JSON)")
+    parser.add_argument("--baseline", default=None, help="results to compare with (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown over the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_all(names, args.min_time, args.repeat)
+    with open(args.output, "w") as file:
+        json.dump({"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                   "benchmarks": results}, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["benchmarks"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.2f} us -> {new:.2f} us ({new / old - 1:+.0%})")
+        if regressions:
+            raise SystemExit(1)
+
+# # Program entry point
+if __name__ == '__main__':
+    main()
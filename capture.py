@@ -0,0 +1,127 @@
+# Import necessary libraries
+import queue  # # For handing the frames to the writer thread
+import sys  # # For streaming to stdout and the byte order of the pixels
+import threading  # # For writing the frames in the background
+import numpy as np  # # For viewing and copying the pixels of the canvas
+import pygame  # # For saving image sequences
+
+def get_channel_bytes(surface):
+    # # Returns the byte index of the red, green and blue channels in a 32-bit pixel of a surface
+    shifts = surface.get_shifts()[:3]
+    if sys.byteorder == "little":
+        return [shift // 8 for shift in shifts]
+    return [3 - shift // 8 for shift in shifts]
+
+# # Captures frames from a render surface (the stddraw canvas) and writes them to a sink on a
+# # background thread: grab() copies the raw pixels through a zero-copy view of the surface into
+# # a pooled buffer and queues it, the writer thread converts them to RGB and writes them; when
+# # the writer falls behind the bounded queue is full and frames are dropped instead of waiting
+class FrameCapture:
+    def __init__(self, sink, max_queue=8):
+        self.sink = sink  # # Object with write(rgb) taking (height, width, 3) uint8 frames and close()
+        self.frames = queue.Queue(max_queue)  # # (raw pixels, width, channel bytes) to write, None ends
+        self.free_buffers = queue.SimpleQueue()  # # Written buffers ready for reuse
+        self.max_buffers = max_queue  # # At most as many buffers as fit into the queue, so put never blocks
+        self.buffer_count = 0
+        self.captured = 0  # # Number of frames queued
+        self.dropped = 0  # # Number of frames dropped because the writer was behind
+        self.error = None  # # Exception raised by the sink, frames are discarded after it
+        self.thread = threading.Thread(target=self.write_frames, daemon=True)
+        self.thread.start()
+
+    def grab(self, surface, block=False):
+        # # Queues a copy of the current pixels of a 32-bit surface (with block set, waits for the
+        # # writer instead of dropping the frame, e.g. for exports that must keep every frame)
+        # # Returns False if the frame was dropped
+        if self.error is not None:
+            raise self.error
+        if surface.get_bytesize() != 4:
+            raise ValueError("Only 32-bit surfaces can be captured")
+        height, pitch = surface.get_height(), surface.get_pitch()
+        buffer = self.get_buffer((height, pitch), block)
+        if buffer is None:
+            self.dropped += 1
+            return False
+        pixels = surface.get_buffer()  # # Locks the surface until the view is released
+        np.copyto(buffer, np.frombuffer(pixels, np.uint8).reshape(height, pitch))
+        del pixels
+        self.frames.put_nowait((buffer, surface.get_width(), get_channel_bytes(surface)))
+        self.captured += 1
+        return True
+
+    def get_buffer(self, shape, block=False):
+        # # Returns a free buffer of the given shape (None when all of them are in use, or
+        # # waits for one with block set)
+        while True:
+            if self.free_buffers.empty() and self.buffer_count < self.max_buffers:
+                self.buffer_count += 1
+                return np.empty(shape, dtype=np.uint8)
+            try:
+                buffer = self.free_buffers.get(block)
+            except queue.Empty:
+                return None
+            if buffer.shape == shape:
+                return buffer
+            self.buffer_count -= 1  # # The canvas size has changed, the old buffer is dropped
+
+    def write_frames(self):
+        # # Writer thread: converts the queued frames to RGB and writes them to the sink
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            buffer, width, channel_bytes = frame
+            rgb = np.ascontiguousarray(buffer[:, :width * 4].reshape(buffer.shape[0], width, 4)[:, :, channel_bytes])
+            self.free_buffers.put(buffer)
+            if self.error is None:
+                try:
+                    self.sink.write(rgb)
+                except Exception as error:
+                    self.error = error
+
+    def close(self):
+        # # Writes the queued frames and closes the sink
+        self.frames.put(None)
+        self.thread.join()
+        self.sink.close()
+        if self.error is not None:
+            raise self.error
+
+# # Sink writing the frames as a raw RGB24 stream (e.g. piped into an encoder:
+# # ffmpeg -f rawvideo -pix_fmt rgb24 -s WIDTHxHEIGHT -r FPS -i - video.mp4)
+class RawVideoSink:
+    def __init__(self, file, close_file=True):
+        self.file = file
+        self.close_file = close_file
+
+    def write(self, rgb):
+        self.file.write(rgb.data)
+
+    def close(self):
+        self.file.flush()
+        if self.close_file:
+            self.file.close()
+
+# # Sink saving every frame as an image file named by a pattern such as frames/%05d.png
+class ImageSequenceSink:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.index = 0
+
+    def write(self, rgb):
+        height, width = rgb.shape[:2]
+        pygame.image.save(pygame.image.frombuffer(rgb.data, (width, height), "RGB"), self.pattern % self.index)
+        self.index += 1
+
+    def close(self):
+        pass
+
+def open_sink(path):
+    # # Returns the sink for a path: "-" streams raw RGB to stdout, a pattern with % saves an
+    # # image sequence and any other path is written as a raw RGB file
+    if path == "-":
+        # # The original stdout, so that prints redirected away from the stream do not end up in it
+        return RawVideoSink(sys.__stdout__.buffer, close_file=False)
+    if "%" in path:
+        return ImageSequenceSink(path)
+    return RawVideoSink(open(path, "wb"))
@@ -0,0 +1,109 @@
+# Import necessary libraries
+import os  # # For checking whether a dataset file exists
+import struct  # # For the file header
+import numpy as np  # # For the fixed-width records and the memory-mapped reader
+from shapes import SHAPE_IDS  # # For numbering the tetromino shapes as in the observations
+
+# # Dataset file layout: a 16 byte header followed by fixed-width position records, so a file of
+# # any size can be memory-mapped as one record array and appending is a plain write at the end
+MAGIC = b"T2DS"
+VERSION = 1
+HEADER = struct.Struct("<4sBHH7x")  # # magic, version, grid_h, grid_w (padded to 16 bytes)
+
+def get_position_dtype(grid_h, grid_w):
+    # # Returns the record of one position: the board and the pieces as in the TetrisEnv
+    # # observations, the placement chosen there, the score it gained, whether the game ended
+    # # with it and the seed of the game
+    return np.dtype([("board", "u1", (grid_h, grid_w)), ("pieces", "u1", 2), ("exponents", "u1", (2, 4)),
+                     ("rotation", "u1"), ("x", "i1"), ("y", "i1"), ("reward", "<i4"), ("done", "u1"),
+                     ("seed", "<u8")])
+
+# # Recorder of the positions of a headless game (installed as its recorder, forwarding to the
+# # recorder it replaces, e.g. a replay.Replay)
+class PositionRecorder:
+    def __init__(self, game):
+        self.game = game
+        self.forward = game.recorder
+        game.recorder = self
+        self.positions = []  # # Record fields of each position, the reward is filled in by get_positions
+        self.scores = []  # # Score before each position
+
+    def record(self, tick, rotation, x, y, engine):
+        # # Records the position before the current piece is locked
+        game = self.game
+        pieces = (game.current_piece, game.next_piece)
+        self.positions.append((engine.board.copy(), [SHAPE_IDS[piece.type] for piece in pieces],
+                               [piece.get_exponents() for piece in pieces], rotation, x, y, 0, 0, game.rng.seed))
+        self.scores.append(engine.score)
+        if self.forward is not None:
+            self.forward.record(tick, rotation, x, y, engine)
+
+    def get_positions(self):
+        # # Returns the recorded positions as a record array
+        engine = self.game.engine
+        positions = np.array(self.positions, dtype=get_position_dtype(engine.grid_height, engine.grid_width))
+        positions["reward"] = np.diff(self.scores + [engine.score])
+        if len(positions) > 0:
+            positions["done"][-1] = self.game.game_over
+        return positions
+
+def read_header(file):
+    # # Returns the grid size stored in the header of a dataset file
+    magic, version, grid_h, grid_w = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Tetris 2048 dataset (or an unsupported version)")
+    return grid_h, grid_w
+
+# # Appends position records to a dataset file (created with a header when it does not exist)
+class PositionWriter:
+    def __init__(self, path, grid_h=20, grid_w=12):
+        self.dtype = get_position_dtype(grid_h, grid_w)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                if read_header(file) != (grid_h, grid_w):
+                    raise ValueError(f"The dataset {path} has a different grid size")
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, grid_h, grid_w))
+        self.count = 0  # # Number of records appended by this writer
+
+    def append(self, positions):
+        # # Appends a record array of positions in one write
+        positions = np.ascontiguousarray(positions, dtype=self.dtype)
+        self.file.write(positions.tobytes())
+        self.count += len(positions)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# # Memory-mapped reader of a dataset file: nothing is loaded until it is accessed, and the
+# # fields are views into the file (boards[i] is a (grid_h, grid_w) array like GridEngine.board)
+class PositionDataset:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.grid_height, self.grid_width = read_header(file)
+        dtype = get_position_dtype(self.grid_height, self.grid_width)
+        count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype, mode="r", offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype)  # # An empty file cannot be memory-mapped
+        self.boards = self.records["board"]
+        self.pieces = self.records["pieces"]
+        self.exponents = self.records["exponents"]
+
+    def __len__(self):
+        return len(self.records)
+
+    def sample(self, count, rng=None):
+        # # Returns count randomly chosen records (copied, read in file order)
+        rng = rng or np.random.default_rng()
+        indexes = np.sort(rng.integers(0, len(self.records), count))
+        return self.records[indexes]
@@ -0,0 +1,77 @@
+# Import necessary libraries
+import time  # # Used for measuring the elapsed time and waiting between frames
+
+# # Fixed timestep scheduler for the game loop: the simulation advances in fixed ticks
+# # (so gameplay does not depend on how long drawing takes) and rendering is capped
+# # to a separate frame rate, skipping frames when the machine cannot keep up
+class GameClock:
+    def __init__(self, tick_interval, max_fps=60, max_ticks_per_frame=5):
+        self.tick_interval = tick_interval  # # Seconds of game time per simulation tick
+        self.frame_interval = 1.0 / max_fps  # # Minimum seconds between two rendered frames
+        self.max_ticks_per_frame = max_ticks_per_frame  # # Ticks run at most before a frame is drawn
+        self.tick_count = 0  # # Total number of simulation ticks run
+        self.reset()
+
+    def reset(self):
+        # # Restarts timing from now (e.g. after a pause) without running the missed ticks
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+        self.next_frame_time = self.last_time
+
+    def advance(self):
+        # # Returns how many simulation ticks are due since the last call
+        now = time.perf_counter()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = int(self.accumulator / self.tick_interval)
+        if ticks > self.max_ticks_per_frame:
+            # # Too far behind: drop the excess time instead of spiralling into more ticks
+            ticks = self.max_ticks_per_frame
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.tick_interval
+        self.tick_count += ticks
+        return ticks
+
+    def should_render(self):
+        # # Returns True when a frame is due, frames that are already late are skipped
+        now = time.perf_counter()
+        if now < self.next_frame_time:
+            return False
+        self.next_frame_time = max(self.next_frame_time + self.frame_interval, now)
+        return True
+
+    def wait(self):
+        # # Sleeps until the next tick or the next frame, whichever comes first
+        next_tick_time = self.last_time + self.tick_interval - self.accumulator
+        delay = min(next_tick_time, self.next_frame_time) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+# # Clock with the same interface for rendering at a fixed frame rate without waiting (e.g. when
+# # exporting a video): every frame advances the game time by exactly one frame interval
+class FrameClock:
+    def __init__(self, tick_interval, fps=30):
+        self.tick_interval = tick_interval  # # Seconds of game time per simulation tick
+        self.frame_interval = 1.0 / fps  # # Seconds of game time per rendered frame
+        self.tick_count = 0  # # Total number of simulation ticks run
+        self.reset()
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def advance(self):
+        # # Returns how many simulation ticks fall into the next frame
+        self.accumulator += self.frame_interval
+        ticks = int(self.accumulator / self.tick_interval)
+        self.accumulator -= ticks * self.tick_interval
+        self.tick_count += ticks
+        return ticks
+
+    def should_render(self):
+        # # Every frame is rendered
+        return True
+
+    def wait(self):
+        pass
@@ -2,20 +2,37 @@
 import lib.stddraw as stddraw  # # Used for drawing and displaying the game window
 from lib.color import Color  # # Used for coloring tiles and background
 from point import Point  # # Used for handling tile coordinate positions
+from grid_engine import GridEngine, tile_number, tile_exponent  # # Used for the game rules (locking, clearing, gravity, merging)
+from tile import Tile  # # Used for drawing the locked tiles stored on the board
 import numpy as np  # # Used for handling tile matrices efficiently
 import time  # # Used for controlling animation and timing
+from collections import deque  # # Used for queueing the merge animations
 import os  # # Used for accessing file paths
+import pygame  # # Used for copying the cached background regions onto the canvas
 import pygame.mixer  # # Used for playing sound effects (e.g., merge sound)
 
-class GameGrid:
-    def __init__(self, grid_h, grid_w):
-        # # Initialize the game grid dimensions and essential variables
-        self.grid_height = grid_h
-        self.grid_width = grid_w
-        self.tile_matrix = np.full((grid_h, grid_w), None)  # # Create a grid filled with None (empty)
+def shift_rank(rank, removed):
+    # # Returns the rank of a tile in its column after the tiles with the given ranks are merged
+    # # away (a removed tile itself has merged into the tile below it)
+    if rank in removed:
+        rank -= 1
+    return rank - sum(1 for removed_rank in removed if removed_rank < rank)
+
+def queue_event(events, event):
+    # # Appends a timed event to a deque of events (the first item is the start time) and
+    # # returns the deque, kept ordered by start time so due events are taken from its front
+    events.append(event)
+    if len(events) > 1 and events[-2][0] > event[0]:
+        events = deque(sorted(events, key=lambda queued: queued[0]))
+    return events
+
+# # Renderer of the game on top of the rules engine
+class GameGrid(GridEngine):
+    def __init__(self, grid_h, grid_w, animations=True):
+        # # Initialize the rules engine and the rendering specific variables
+        super().__init__(grid_h, grid_w)
         self.current_tetromino = None  # # Active tetromino currently falling
         self.next_tetromino = None  # # Next tetromino to be previewed
-        self.game_over = False  # # Game over flag
 
         # # Visual appearance settings
         self.empty_cell_color = Color(245, 245, 220)  # # Background color for empty cells
@@ -23,12 +40,18 @@ class GameGrid:
         self.boundary_color = Color(0, 100, 200)  # # Boundary box color
         self.line_thickness = 0.001  # # Thickness of grid lines
         self.box_thickness = 10 * self.line_thickness  # # Thickness of the boundary box
-        self.score = 0  # # Initial score set to 0
+        self.show_controls = True  # # The profiler overlay is drawn in place of the controls
 
-        # # Animation settings
+        # # Animation settings (merges are resolved at once, their animations are queued as
+        # # timed events and played on the following frames)
+        self.animations_enabled = animations  # # Headless grids skip the animations completely
         self.merge_animation_duration = 0.15  # # Duration of merge animation (in seconds)
-        self.merge_flash_color = Color(255, 255, 255)  # # Flash color for merging effect
-        self.animation_active = False  # # Whether an animation is currently active
+        self.merge_animations = deque()  # # Queued (start time, merged positions) events
+        self.merge_sounds = deque()  # # Queued (start time,) events, the merge sound plays when they start
+        self.merge_steps = []  # # Merged tiles of each step of the current lock, as (col, rank in the column)
+
+        # # Retained rendering state: the cached static background and what is drawn over it
+        self.background = None
 
         # # Initialize sound effects
         pygame.mixer.init()
@@ -39,77 +62,158 @@ class GameGrid:
             self.merge_sound = None
 
     def display(self):
-        # # Draws the entire game screen including the grid, side panel, and active tetromino
+        # # Draws the game screen including the grid, side panel, and active tetromino
+        # # (the caller shows the canvas, so drawing does not block the game loop)
+        # # The static background is cached and only the parts that changed since the last
+        # # frame are redrawn over it
+        if self.background is None or self.background_key != self.get_canvas_key():
+            self.draw_background()
+
+        # # Draw locked tiles and current tetromino
+        self.draw_grid()
+
+        # # Draw next tetromino preview and the score on the side panel
+        self.draw_next_preview()
+        stddraw.setPenColor(Color(0, 0, 0))
+        self.draw_text_region("score", self.grid_width + 3.5, self.grid_height - 10.5, str(self.score), 31, 5, 1.5)
+
+    def get_canvas_key(self):
+        # # Returns the canvas size and scale the cached background was drawn for
+        return (stddraw._surface.get_size(), stddraw._scaleX(0), stddraw._scaleY(0), stddraw._factorX(1), stddraw._factorY(1))
+
+    def invalidate(self):
+        # # Forces a full redraw on the next frame (e.g. after a menu has cleared the canvas)
+        self.background = None
+
+    def draw_background(self):
+        # # Draws the static parts of the screen (empty cells, grid lines, labels) and caches them
         stddraw.clear(Color(250, 248, 239))  # # Clear the screen with background color
 
         # # Draw empty tiles (background)
+        stddraw.setPenColor(self.empty_cell_color)
         for row in range(self.grid_height):
             for col in range(self.grid_width):
-                stddraw.setPenColor(self.empty_cell_color)
                 stddraw.filledSquare(col, row, 0.5)
 
-        # # Draw locked tiles and current tetromino
-        self.draw_grid()
-
-        if self.current_tetromino is not None:
-            self.current_tetromino.draw()
+        # # Draw grid lines
+        stddraw.setPenColor(self.line_color)
+        stddraw.setPenRadius(self.line_thickness)
+        start_x, end_x = -0.5, self.grid_width - 0.5
+        start_y, end_y = -0.5, self.grid_height - 0.5
+        for x in np.arange(start_x + 1, end_x, 1):
+            stddraw.line(x, start_y, x, end_y)
+        for y in np.arange(start_y + 1, end_y, 1):
+            stddraw.line(start_x, y, end_x, y)
+        stddraw.setPenRadius()
 
-        # # Draw side panel for next piece preview and score
+        # # Draw side panel labels
         panel_x = self.grid_width + 1
         stddraw.setPenColor(Color(0, 0, 0))
         stddraw.setFontSize(20)
         stddraw.text(panel_x + 1, self.grid_height - 2, "Next Piece:")
         stddraw.text(panel_x + 1, self.grid_height - 9, "Score:")
+
+        # # Display control instructions
+        if self.show_controls:
+            stddraw.text(panel_x + 1.5, self.grid_height - 13, "Controls:")
+            stddraw.text(panel_x + 1.5, self.grid_height - 14.5, "← → ↓ : Move")
+            stddraw.text(panel_x + 1.5, self.grid_height - 15.5, "↑ : Rotate")
+            stddraw.text(panel_x + 1.5, self.grid_height - 16.5, "Space : Drop")
+            stddraw.text(panel_x + 1.5, self.grid_height - 17.5, "P : Pause")
+            stddraw.text(panel_x + 1.5, self.grid_height - 18.5, "R : Resume")
+            stddraw.text(panel_x + 1.5, self.grid_height - 19.5, "Q : Quit")
         stddraw.setFontSize(16)
 
-        # # Draw next tetromino preview
+        # # Cache the background and reset what is known to be drawn over it
+        self.background = stddraw._surface.copy()
+        self.background_key = self.get_canvas_key()
+        self.drawn_frame = np.zeros((self.grid_height, self.grid_width), dtype=np.uint8)
+        self.drawn_animating = {}
+        self.drawn_preview = None
+        self.drawn_texts = {}
+
+    def restore_background(self, x, y, width, height):
+        # # Copies the cached background back over a region (x, y is its bottom left corner)
+        # # with a one pixel margin for the borders drawn around the tiles
+        left = int(stddraw._scaleX(x)) - 1
+        top = int(stddraw._scaleY(y + height)) - 1
+        rect = pygame.Rect(left, top, int(stddraw._factorX(width)) + 3, int(stddraw._factorY(height)) + 3)
+        stddraw._surface.blit(self.background, rect.topleft, rect)
+
+    def draw_grid(self):
+        # # Draws the locked tiles and the current tetromino on the cells that changed since
+        # # the last frame (Tile objects are only created here, the board stores tile exponents)
+        frame = self.board.copy()
+        if self.current_tetromino is not None:
+            tetromino = self.current_tetromino
+            for (row, col), tile in zip(tetromino.rotation_tables[tetromino.rotation].cells, tetromino.tiles):
+                position = tetromino.get_cell_position(row, col)
+                # # draw only the tiles that are inside the game grid
+                if self.is_inside(position.y, position.x):
+                    frame[position.y, position.x] = tile_exponent(tile.number)
+        animating = self.get_animation_states()
+
+        # # Changed cells are restored from the background and redrawn, scaled (animating)
+        # # tiles also cover their neighbors so those are redrawn as well
+        dirty = set(map(tuple, np.argwhere(frame != self.drawn_frame).tolist()))
+        for row, col in animating.keys() | self.drawn_animating.keys():
+            for d_row in (-1, 0, 1):
+                for d_col in (-1, 0, 1):
+                    if self.is_inside(row + d_row, col + d_col):
+                        dirty.add((row + d_row, col + d_col))
+        if not dirty:
+            return
+
+        # # Occupied neighbors of the restored cells get their borders redrawn (the restored
+        # # rectangle overlaps the borders of all 8 neighbors, the diagonal ones at the corners)
+        redraw = set(dirty)
+        for row, col in dirty:
+            for d_row in (-1, 0, 1):
+                for d_col in (-1, 0, 1):
+                    if self.is_inside(row + d_row, col + d_col) and frame[row + d_row, col + d_col] != 0:
+                        redraw.add((row + d_row, col + d_col))
+
+        for row, col in dirty:
+            self.restore_background(col - 0.5, row - 0.5, 1, 1)
+        for row, col in sorted(redraw, key=lambda cell: cell in animating):
+            if frame[row, col] != 0:
+                scale, flash = animating.get((row, col), (1.0, False))
+                Tile(tile_number(frame[row, col])).draw(Point(col, row), scale, flash)
+
+        self.drawn_frame = frame
+        self.drawn_animating = animating
+
+    def draw_next_preview(self):
+        # # Draws the next tetromino preview when the next tetromino has changed
+        preview = None
+        if self.next_tetromino is not None:
+            preview = (self.next_tetromino.type, self.next_tetromino.rotation,
+                       tuple(tile.number for tile in self.next_tetromino.tiles))
+        if preview == self.drawn_preview:
+            return
+
+        offset_x = self.grid_width + 2.5
+        offset_y = self.grid_height - 4
+        self.restore_background(offset_x - 0.5, offset_y - 3.5, 4, 4)
         if self.next_tetromino is not None:
             n = len(self.next_tetromino.tile_matrix)
-            offset_x = self.grid_width + 2.5
-            offset_y = self.grid_height - 4
             for row in range(n):
                 for col in range(n):
                     tile = self.next_tetromino.tile_matrix[row][col]
                     if tile is not None:
                         pos = Point(offset_x + col, offset_y - row)
                         tile.draw(pos)
-
-        # # Draw the score
-        stddraw.setFontSize(31)
-        stddraw.text(panel_x + 2.5, self.grid_height - 10.5, str(self.score))
-
-        # # Display control instructions
-        stddraw.setFontSize(20)
-        stddraw.text(panel_x + 1.5, self.grid_height - 13, "Controls:")
-        stddraw.text(panel_x + 1.5, self.grid_height - 14.5, "← → ↓ : Move")
-        stddraw.text(panel_x + 1.5, self.grid_height - 15.5, "↑ : Rotate")
-        stddraw.text(panel_x + 1.5, self.grid_height - 16.5, "Space : Drop")
-        stddraw.text(panel_x + 1.5, self.grid_height - 17.5, "P : Pause")
-        stddraw.text(panel_x + 1.5, self.grid_height - 18.5, "R : Resume")
-        stddraw.text(panel_x + 1.5, self.grid_height - 19.5, "Q : Quit")
-
-        # # Update the screen (faster if animation is ongoing)
-        refresh_time = 25 if self.animation_active else 250
-        stddraw.show(refresh_time)
-
-    def draw_grid(self):
-        # # Draws all locked tiles and the grid lines
-        for row in range(self.grid_height):
-            for col in range(self.grid_width):
-                if self.tile_matrix[row][col] is not None:
-                    scale = 1.1 if self.animation_active and hasattr(self, 'animating_tiles') and (row, col) in self.animating_tiles else 1.0
-                    self.tile_matrix[row][col].draw(Point(col, row), scale)
-
-        # # Draw grid lines
-        stddraw.setPenColor(self.line_color)
-        stddraw.setPenRadius(self.line_thickness)
-        start_x, end_x = -0.5, self.grid_width - 0.5
-        start_y, end_y = -0.5, self.grid_height - 0.5
-        for x in np.arange(start_x + 1, end_x, 1):
-            stddraw.line(x, start_y, x, end_y)
-        for y in np.arange(start_y + 1, end_y, 1):
-            stddraw.line(start_x, y, end_x, y)
-        stddraw.setPenRadius()
+        self.drawn_preview = preview
+
+    def draw_text_region(self, name, x, y, text, font_size, width, height):
+        # # Draws a text centered at (x, y) with the current pen color when it differs from the
+        # # text last drawn under the same name, the region of size width x height is restored first
+        if self.background is None or self.drawn_texts.get(name) == text:
+            return
+        self.restore_background(x - width / 2, y - height / 2, width, height)
+        stddraw.setFontSize(font_size)
+        stddraw.text(x, y, text)
+        self.drawn_texts[name] = text
 
     def draw_boundaries(self):
         # # Draws an outer boundary around the grid
@@ -118,171 +222,75 @@ class GameGrid:
         stddraw.rectangle(-0.5, -0.5, self.grid_width, self.grid_height)
         stddraw.setPenRadius()
 
-    def is_occupied(self, row, col):
-        # # Returns True if the specified cell is occupied by a tile
-        if not self.is_inside(row, col):
-            return False
-        return self.tile_matrix[row][col] is not None
-
-    def is_inside(self, row, col):
-        # # Returns True if the given (row, col) is within the grid
-        return 0 <= row < self.grid_height and 0 <= col < self.grid_width
-
-    def clear_full_rows(self):
-        # # Clears any fully occupied rows and shifts above rows downward
-        rows_cleared = 0
-        for row in range(self.grid_height):
-            if all(self.tile_matrix[row]):
-                for col in range(self.grid_width):
-                    self.tile_matrix[row][col] = None
-                rows_cleared += 1
-
-        if rows_cleared > 0:
-            for _ in range(rows_cleared):
-                for row in range(self.grid_height - 1, 0, -1):
-                    for col in range(self.grid_width):
-                        if self.tile_matrix[row - 1][col] is not None:
-                            self.tile_matrix[row][col] = self.tile_matrix[row - 1][col]
-                            self.tile_matrix[row - 1][col] = None
-                for col in range(self.grid_width):
-                    self.tile_matrix[0][col] = None
-
-        return rows_cleared
-
     def update_grid(self, tiles_to_lock, blc_position):
-        # # Locks a placed tetromino into the grid and handles gravity and merges
+        # # Locks the placed tetromino through the rules engine (the piece is no longer drawn)
         self.current_tetromino = None
-        n_rows, n_cols = len(tiles_to_lock), len(tiles_to_lock[0])
-
-        for col in range(n_cols):
-            for row in range(n_rows):
-                if tiles_to_lock[row][col] is not None:
-                    pos = Point()
-                    pos.x = blc_position.x + col
-                    pos.y = blc_position.y + (n_rows - 1) - row
-
-                    if pos.y >= self.grid_height:
-                        self.game_over = True
-                        return True
-
-                    if self.is_inside(pos.y, pos.x):
-                        self.tile_matrix[pos.y][pos.x] = tiles_to_lock[row][col]
-                    else:
-                        self.game_over = True
-                        return True
-
-        self.clear_full_rows()
-
-        changed = True
-        while changed:
-            changed = False
-            if self.apply_gravity_all():
-                changed = True
-            if self.apply_merge_all():
-                changed = True
-
-        for col in range(self.grid_width):
-            full = True
-            for row in range(self.grid_height):
-                if self.tile_matrix[row][col] is None:
-                    full = False
-                    break
-            if full:
-                self.game_over = True
-                return True
-
-        return self.game_over
-
-    def apply_gravity_all(self):
-        # # Applies gravity to all connected tiles that can fall downward
-        changed = False
-        visited = set()
-        components = []
-
-        def find_connected(row, col, component):
-            if (row, col) in visited or row < 0 or row >= self.grid_height or col < 0 or col >= self.grid_width:
-                return
-            if self.tile_matrix[row][col] is None:
-                return
-            visited.add((row, col))
-            component.append((row, col))
-            find_connected(row, col-1, component)
-            find_connected(row, col+1, component)
-
-        for row in range(self.grid_height):
-            for col in range(self.grid_width):
-                if self.tile_matrix[row][col] is not None and (row, col) not in visited:
-                    component = []
-                    find_connected(row, col, component)
-                    components.append(component)
-
-        for component in components:
-            can_fall = True
-            for row, col in component:
-                if row == 0 or (self.tile_matrix[row-1][col] is not None and (row-1, col) not in component):
-                    can_fall = False
-                    break
-            if can_fall:
-                tiles = {}
-                for row, col in component:
-                    tiles[(row, col)] = self.tile_matrix[row][col]
-                    self.tile_matrix[row][col] = None
-                for (row, col), tile in tiles.items():
-                    self.tile_matrix[row-1][col] = tile
-                changed = True
-
-        return changed
-
-    def apply_merge_all(self):
-        # # Merges vertically adjacent tiles with the same number
-        changed = False
-        merge_positions = []
-
-        for col in range(self.grid_width):
-            row = 0
-            while row < self.grid_height - 1:
-                tile1 = self.tile_matrix[row][col]
-                tile2 = self.tile_matrix[row + 1][col]
-
-                if tile1 and tile2 and tile1.number == tile2.number:
-                    merge_positions.append((row, col))
-                    merge_positions.append((row + 1, col))
-                    tile1.number *= 2
-                    self.score += tile1.number
-                    tile1.set_colors()
-                    self.tile_matrix[row + 1][col] = None
-                    changed = True
-                    row += 1
-                row += 1
-
-        if merge_positions:
-            self.show_merge_animation(merge_positions)
+        return super().update_grid(tiles_to_lock, blc_position)
+
+    def lock_cells(self, cells):
+        # # Locks the tiles through the rules engine and queues the effects of the merges
+        self.merge_steps = []
+        game_over = super().lock_cells(cells)
+        self.queue_merge_effects()
+        return game_over
+
+    def on_merge(self, positions):
+        # # Tracks the tiles merged by a step of the cascade until the board is settled: later
+        # # gravity passes keep the order of the tiles in a column, so a tile is tracked by its
+        # # rank in its column, which only changes when a tile below it is merged away
+        merged_rows = {}  # # Column -> rows of the merged (lower) tiles of this step (the engine scans bottom-up)
+        for row, col in positions[::2]:
+            merged_rows.setdefault(col, []).append(row)
+
+        step = []
+        for col, rows in merged_rows.items():
+            column = self.board[:, col] != 0
+            # # Ranks that the upper tiles of the pairs had before they were merged away
+            removed = [int(column[:row + 1].sum()) + index for index, row in enumerate(rows)]
+            for tiles in self.merge_steps:
+                tiles[:] = [(tile_col, shift_rank(rank, removed) if tile_col == col else rank)
+                            for tile_col, rank in tiles]
+            step.extend((col, int(column[:row].sum())) for row in rows)
+        self.merge_steps.append(step)
+
+    def queue_merge_effects(self):
+        # # Queues the flashing animation and the sound of each merge step of the last lock on the
+        # # settled positions of the merged tiles without blocking the game loop (each merge step
+        # # of a cascade starts when the previous one ends)
+        now = time.perf_counter()
+        for index, tiles in enumerate(self.merge_steps):
+            start_time = now + index * self.merge_animation_duration
+            if self.animations_enabled:
+                positions = []
+                for col, rank in tiles:
+                    rows = np.flatnonzero(self.board[:, col])
+                    if rank < len(rows):
+                        positions.append((int(rows[rank]), col))
+                self.merge_animations = queue_event(self.merge_animations, (start_time, positions))
             if self.merge_sound:
-                self.merge_sound.play()
-
-        return changed
-
-    def show_merge_animation(self, positions):
-        # # Shows flashing animation when tiles merge
-        self.animation_active = True
-        self.animating_tiles = positions
-
-        for stage in range(3):
-            for row, col in positions:
-                if self.tile_matrix[row][col] is not None:
-                    if stage % 2 == 0:
-                        self.tile_matrix[row][col].background_color = self.merge_flash_color
-                    else:
-                        self.tile_matrix[row][col].set_colors()
-            self.display()
-            time.sleep(self.merge_animation_duration / 3)
-
-        for row, col in positions:
-            if self.tile_matrix[row][col] is not None:
-                self.tile_matrix[row][col].set_colors()
-
-        self.animation_active = False
-        self.display()
+                self.merge_sounds = queue_event(self.merge_sounds, (start_time,))
+        self.merge_steps = []
+
+    def get_animation_states(self):
+        # # Returns the (scale, flash) state of each animating cell at the current time
+        # # The tiles flash in the first and last third and shrink back from 1.1 to their normal size
+        now = time.perf_counter()
+        while self.merge_sounds and self.merge_sounds[0][0] <= now:
+            self.merge_sounds.popleft()
+            self.merge_sound.play()  # # The sound of a merge step plays when its animation starts
+        while self.merge_animations and now - self.merge_animations[0][0] >= self.merge_animation_duration:
+            self.merge_animations.popleft()
+
+        states = {}
+        for start_time, positions in self.merge_animations:
+            progress = (now - start_time) / self.merge_animation_duration
+            if not 0 <= progress < 1:
+                continue  # # This event has not started yet
+            flash = int(progress * 3) % 2 == 0
+            scale = round((1.1 - 0.1 * progress) * 50) / 50  # # Quantized to reuse the tile sprites
+            for position in positions:
+                states[position] = (scale, flash)
+        return states
 
     def display_game_over(self):
         # # Displays the Game Over screen with the option to restart
@@ -0,0 +1,46 @@
+# Import necessary libraries
+import numpy as np  # # Used for generating the random streams in chunks
+from shapes import SHAPE_TYPES  # # Used for the tetromino shapes
+
+# # Random source of one game: the shapes, the numbers on the tiles and the spawn columns come
+# # from three independent streams derived from the seed, each pre-generated in chunks, so the
+# # same seed always gives the same game and games never share random state
+class GameRandom:
+    def __init__(self, seed=None, bag=False, chunk_size=256):
+        if seed is None:
+            # # Draw a seed, so that a game started without one can still be reproduced
+            seed = int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0] >> 1)
+        self.seed = seed
+        self.bag = bag  # # With bag set, shapes are dealt in shuffled bags of all 7 shapes
+        self.chunk_size = chunk_size  # # Number of values generated at once
+        shape_seed, number_seed, column_seed = np.random.SeedSequence(seed).spawn(3)
+        self.shape_rng = np.random.default_rng(shape_seed)
+        self.number_rng = np.random.default_rng(number_seed)
+        self.column_rng = np.random.default_rng(column_seed)
+        self.shapes, self.numbers, self.columns = [], [], []
+
+    def next_shape(self):
+        # # Returns the shape of the next tetromino
+        if not self.shapes:
+            if self.bag:
+                bag_count = -(-self.chunk_size // len(SHAPE_TYPES))
+                bags = np.tile(np.arange(len(SHAPE_TYPES)), (bag_count, 1))
+                indexes = self.shape_rng.permuted(bags, axis=1).ravel()
+            else:
+                indexes = self.shape_rng.integers(0, len(SHAPE_TYPES), self.chunk_size)
+            # # Reversed, so the next value is popped from the end of the list
+            self.shapes = [SHAPE_TYPES[index] for index in indexes[::-1]]
+        return self.shapes.pop()
+
+    def next_numbers(self):
+        # # Returns the numbers (2 or 4) on the four tiles of the next tetromino
+        if not self.numbers:
+            exponents = self.number_rng.integers(1, 3, (self.chunk_size, 4))
+            self.numbers = np.left_shift(1, exponents).tolist()[::-1]
+        return self.numbers.pop()
+
+    def next_spawn_x(self, n, grid_w):
+        # # Returns the spawn column of the next tetromino with an n x n tile matrix
+        if not self.columns:
+            self.columns = self.column_rng.random(self.chunk_size).tolist()[::-1]
+        return int(self.columns.pop() * (grid_w - n + 1))
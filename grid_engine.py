@@ -0,0 +1,315 @@
+# Import necessary libraries
+from point import Point  # # Used for handling tile coordinate positions
+import numpy as np  # # Used for handling tile matrices efficiently
+
+# # Tiles are stored on the board as exponents (log2 of the tile number), 0 means empty
+def tile_exponent(number):
+    # # Returns the exponent stored on the board for a tile number (2 -> 1, 4 -> 2, ...)
+    return number.bit_length() - 1
+
+def tile_number(exponent):
+    # # Returns the tile number for an exponent stored on the board
+    return 1 << int(exponent)
+
+# # Zobrist hashing: every (cell, tile exponent) pair has a random 64-bit key and the hash of a
+# # board is the XOR of the keys of its tiles, so changing a cell changes the hash in O(1)
+ZOBRIST_SEED = 2048  # # Fixed seed, so the hash of a board is the same in every process and run
+ZOBRIST_EXPONENTS = 32  # # Number of tile exponents with keys (0 = empty up to 2^31)
+zobrist_keys = {}  # # (grid_h, grid_w) -> keys of that grid size
+
+def get_zobrist_keys(grid_h, grid_w):
+    # # Returns the (grid_h, grid_w, ZOBRIST_EXPONENTS) Zobrist keys of a grid size, where the
+    # # key of an empty cell (exponent 0) is 0 so that empty cells do not change the hash
+    if (grid_h, grid_w) not in zobrist_keys:
+        rng = np.random.default_rng(ZOBRIST_SEED)
+        keys = rng.integers(0, 2**64, size=(grid_h, grid_w, ZOBRIST_EXPONENTS), dtype=np.uint64, endpoint=False)
+        keys[:, :, 0] = 0
+        zobrist_keys[(grid_h, grid_w)] = keys
+    return zobrist_keys[(grid_h, grid_w)]
+
+def pack_bits(matrix):
+    # # Packs each row of a boolean matrix into an integer bitmask (bit j is set when matrix[i, j] is)
+    if matrix.shape[1] < 63:
+        # # Rows that fit into an int64 are packed with a single matrix product
+        return (matrix @ (1 << np.arange(matrix.shape[1], dtype=np.int64))).tolist()
+    packed = np.packbits(matrix, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+# # Pure rules engine of the game: locking, row clears, gravity and merges
+# # (no drawing, no sleeping and no pygame, so it can run headless)
+class GridEngine:
+    def __init__(self, grid_h, grid_w):
+        # # Initialize the game grid dimensions and the rule state
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.board = np.zeros((grid_h, grid_w), dtype=np.uint8)  # # Tile exponents, 0 means an empty cell
+        self.game_over = False  # # Game over flag
+        self.score = 0  # # Initial score set to 0
+        self.lines_cleared = 0  # # Number of rows cleared so far
+        self.merge_count = 0  # # Number of tile merges so far
+        self.zobrist_keys = get_zobrist_keys(grid_h, grid_w)
+        self.state_hash = 0  # # 64-bit Zobrist hash of the board, updated with every changed cell
+
+        # # Dirty regions: only the rows and columns changed since the last settle are revisited
+        self.gravity_from_row = grid_h  # # Lowest changed row that gravity has to settle from
+        self.merge_from_rows = np.full(grid_w, grid_h)  # # Lowest changed row of each column for merging
+        self.mark_all_dirty()
+
+    def on_merge(self, positions):
+        # # Hook called with the merged (row, col) positions after each merge pass
+        # # (the engine itself does nothing here, renderers override it)
+        pass
+
+    def copy(self):
+        # # Returns a headless copy of the rule state (only the board array is copied)
+        engine = GridEngine.__new__(GridEngine)  # # Skips __init__, every attribute is set below
+        engine.grid_height = self.grid_height
+        engine.grid_width = self.grid_width
+        engine.board = self.board.copy()
+        engine.gravity_from_row = self.gravity_from_row
+        engine.merge_from_rows = self.merge_from_rows.copy()
+        engine.row_bits = list(self.row_bits)
+        engine.col_bits = list(self.col_bits)
+        engine.game_over = self.game_over
+        engine.score = self.score
+        engine.lines_cleared = self.lines_cleared
+        engine.merge_count = self.merge_count
+        engine.zobrist_keys = self.zobrist_keys
+        engine.state_hash = self.state_hash
+        return engine
+
+    def mark_dirty(self, row, first_col, last_col):
+        # # Marks the cells of a row between the given columns as changed
+        self.gravity_from_row = min(self.gravity_from_row, row)
+        np.minimum(self.merge_from_rows[first_col:last_col + 1], row, out=self.merge_from_rows[first_col:last_col + 1])
+
+    def mark_all_dirty(self):
+        # # Marks the whole board as changed (e.g. after assigning the board directly)
+        self.mark_dirty(0, 0, self.grid_width - 1)
+        self.update_bitboards()
+        self.state_hash = self.hash_cells(slice(None), slice(None))
+
+    def hash_cell(self, row, col):
+        # # Returns the Zobrist key of the tile in a cell (0 for an empty cell)
+        return int(self.zobrist_keys[row, col, self.board[row, col]])
+
+    def hash_cells(self, rows, cols):
+        # # Returns the XOR of the Zobrist keys of the tiles in the cells selected by the given
+        # # row and column slices; XOR-ing it into state_hash before and after changing these
+        # # cells updates the hash
+        keys = np.take_along_axis(self.zobrist_keys[rows, cols], self.board[rows, cols][..., None], axis=-1)
+        return int(np.bitwise_xor.reduce(keys, axis=None))
+
+    def update_bitboards(self):
+        # # Rebuilds the occupancy bitboards kept alongside the board: one bitmask per row
+        # # (bit col) for collision tests and one per column (bit row) for drop distances
+        occupied = self.board != 0
+        self.row_bits = pack_bits(occupied)
+        self.col_bits = pack_bits(occupied.T)
+
+    def collides(self, table, x, y):
+        # # Returns True if a tetromino in the given rotation state (see shapes.py) with its
+        # # bottom left cell at (x, y) is out of the grid or overlaps a tile
+        # # (cells above the top of the grid are free as in is_occupied)
+        top_y = y + table.n - 1
+        if x + table.min_col < 0 or x + table.max_col >= self.grid_width or top_y - table.max_row < 0:
+            return True
+        for row, mask in table.row_masks:
+            grid_row = top_y - row
+            if grid_row < self.grid_height:
+                if self.row_bits[grid_row] & (mask << x if x >= 0 else mask >> -x):
+                    return True
+        return False
+
+    def drop_distance(self, table, x, y):
+        # # Returns how many rows a tetromino in the given rotation state with its bottom left
+        # # cell at (x, y) can fall (the landing row of a hard drop or a ghost piece is y minus it)
+        top_y = y + table.n - 1
+        distance = top_y - table.max_row
+        for row, col in table.bottommost:
+            grid_row = top_y - row
+            below = self.col_bits[x + col] & ((1 << grid_row) - 1)
+            if below:
+                distance = min(distance, grid_row - below.bit_length())
+        return distance
+
+    def is_occupied(self, row, col):
+        # # Returns True if the specified cell is occupied by a tile
+        if not self.is_inside(row, col):
+            return False
+        return self.board[row, col] != 0
+
+    def is_inside(self, row, col):
+        # # Returns True if the given (row, col) is within the grid
+        return 0 <= row < self.grid_height and 0 <= col < self.grid_width
+
+    def clear_full_rows(self):
+        # # Clears all fully occupied rows at once and compacts the rows above them downward
+        # # Returns the indices of the cleared rows and the sum of the tile numbers on each of them
+        full_rows = self.board.all(axis=1)
+        cleared_rows = np.flatnonzero(full_rows)
+        if len(cleared_rows) == 0:
+            return cleared_rows, np.zeros(0, dtype=np.int64)
+
+        row_sums = np.left_shift(1, self.board[cleared_rows].astype(np.int64)).sum(axis=1)
+        # # Only the rows from the lowest cleared one up change
+        changed_rows = slice(int(cleared_rows[0]), self.grid_height)
+        self.state_hash ^= self.hash_cells(changed_rows, slice(None))
+        remaining = self.board[~full_rows]
+        self.board[:len(remaining)] = remaining
+        self.board[len(remaining):] = 0
+        self.state_hash ^= self.hash_cells(changed_rows, slice(None))
+        self.mark_dirty(int(cleared_rows[0]), 0, self.grid_width - 1)
+
+        return cleared_rows, row_sums
+
+    def update_grid(self, tiles_to_lock, blc_position):
+        # # Locks a placed tetromino into the grid and handles gravity and merges
+        n_rows, n_cols = len(tiles_to_lock), len(tiles_to_lock[0])
+
+        cells = []
+        for col in range(n_cols):
+            for row in range(n_rows):
+                if tiles_to_lock[row][col] is not None:
+                    pos = Point()
+                    pos.x = blc_position.x + col
+                    pos.y = blc_position.y + (n_rows - 1) - row
+                    cells.append((pos.y, pos.x, tile_exponent(tiles_to_lock[row][col].number)))
+
+        return self.lock_cells(cells)
+
+    def lock_piece(self, table, x, y, exponents):
+        # # Locks a tetromino given by its rotation table (see shapes.py), the position of its
+        # # bottom left cell and the exponents of its tiles (in the order of the table cells)
+        top_y = y + table.n - 1
+        return self.lock_cells([(top_y - row, x + col, exponent) for (row, col), exponent in zip(table.cells, exponents)])
+
+    def lock_cells(self, cells):
+        # # Locks the given (row, col, exponent) tiles into the grid and handles gravity and merges
+        for row, col, exponent in cells:
+            if row >= self.grid_height:
+                self.game_over = True
+                return True
+
+            if self.is_inside(row, col):
+                self.state_hash ^= self.hash_cell(row, col)
+                self.board[row, col] = exponent
+                self.state_hash ^= self.hash_cell(row, col)
+                self.mark_dirty(row, col, col)
+            else:
+                self.game_over = True
+                return True
+
+        # # Points are awarded for each cleared row (the sum of all numbers in the row)
+        cleared_rows, row_sums = self.clear_full_rows()
+        self.score += int(row_sums.sum())
+        self.lines_cleared += len(cleared_rows)
+
+        changed = True
+        while changed:
+            changed = False
+            if self.apply_gravity_all():
+                changed = True
+            if self.apply_merge_all():
+                changed = True
+
+        self.update_bitboards()
+
+        # # The game is over when any column is filled up to the top
+        if self.board.all(axis=0).any():
+            self.game_over = True
+
+        return self.game_over
+
+    def find_components(self, from_row=0):
+        # # Labels the connected components (horizontal runs of tiles) of the board in one pass
+        # # Returns the row, the first column and the last column of each run starting from the
+        # # given row, ordered bottom-up
+        occupied = self.board[from_row:] != 0
+        run_starts = occupied.copy()
+        run_starts[:, 1:] &= ~occupied[:, :-1]
+        run_ends = occupied.copy()
+        run_ends[:, :-1] &= ~occupied[:, 1:]
+        rows, first_cols = np.nonzero(run_starts)
+        last_cols = np.nonzero(run_ends)[1]
+        return (rows + from_row).tolist(), first_cols.tolist(), last_cols.tolist()
+
+    def apply_gravity_all(self):
+        # # Drops every connected component that can fall as far as it can fall in a single pass
+        # # (components are settled bottom-up, so each one lands on the already settled ones)
+        # # Only the rows above the lowest changed row are revisited, the ones below are settled
+        from_row = self.gravity_from_row
+        self.gravity_from_row = self.grid_height
+        if from_row >= self.grid_height:
+            return False
+
+        # # Lowest free row above the settled tiles of each column
+        settled_height = [0] * self.grid_width
+        if from_row > 0:
+            settled = self.board[:from_row] != 0
+            settled_height = np.where(settled.any(axis=0), from_row - settled[::-1].argmax(axis=0), 0).tolist()
+
+        changed = False
+        for row, first_col, last_col in zip(*self.find_components(from_row)):
+            landing_row = max(settled_height[first_col:last_col + 1])
+            if landing_row < row:
+                # # A falling component sticks to a settled tile it becomes horizontally adjacent to
+                for side_col in (first_col - 1, last_col + 1):
+                    if 0 <= side_col < self.grid_width:
+                        side_rows = np.flatnonzero(self.board[landing_row:row, side_col])
+                        if len(side_rows) > 0:
+                            landing_row = max(landing_row, landing_row + int(side_rows[-1]))
+            if landing_row < row:
+                # # The landing cells are empty, so the moved tiles only change the hash by their keys
+                # # at the old and the new row
+                run_cols = slice(first_col, last_col + 1)
+                self.state_hash ^= self.hash_cells(row, run_cols)
+                self.board[landing_row, run_cols] = self.board[row, run_cols]
+                self.board[row, run_cols] = 0
+                self.state_hash ^= self.hash_cells(landing_row, run_cols)
+                np.minimum(self.merge_from_rows[first_col:last_col + 1], landing_row,
+                           out=self.merge_from_rows[first_col:last_col + 1])
+                changed = True
+            for col in range(first_col, last_col + 1):
+                settled_height[col] = landing_row + 1
+
+        return changed
+
+    def apply_merge_all(self):
+        # # Merges vertically adjacent tiles with the same number
+        # # Only the changed columns are scanned, starting just below their lowest changed row
+        # # (there are no mergeable pairs left below it since the last settle)
+        changed = False
+        merge_positions = []
+
+        dirty_cols = np.flatnonzero(self.merge_from_rows < self.grid_height).tolist()
+        from_rows = self.merge_from_rows[dirty_cols].tolist()
+        self.merge_from_rows[dirty_cols] = self.grid_height
+
+        for col, from_row in zip(dirty_cols, from_rows):
+            column = self.board[:, col]
+            row = max(from_row - 1, 0)
+            while row < self.grid_height - 1:
+                exponent1 = column[row]
+                exponent2 = column[row + 1]
+
+                if exponent1 != 0 and exponent1 == exponent2:
+                    merge_positions.append((row, col))
+                    merge_positions.append((row + 1, col))
+                    self.merge_count += 1
+                    self.state_hash ^= self.hash_cell(row, col) ^ self.hash_cell(row + 1, col)
+                    column[row] = exponent1 + 1
+                    self.score += tile_number(exponent1 + 1)
+                    column[row + 1] = 0
+                    self.state_hash ^= self.hash_cell(row, col)
+                    # # The grown tile may merge again and the tiles above the gap may fall
+                    self.mark_dirty(row, col, col)
+                    self.gravity_from_row = min(self.gravity_from_row, row + 1)
+                    changed = True
+                    row += 1
+                row += 1
+
+        if merge_positions:
+            self.on_merge(merge_positions)
+
+        return changed
@@ -0,0 +1,125 @@
+# Import necessary libraries
+import copy  # # Used for copying the random source with the game
+from game_random import GameRandom  # # Used for generating random tetromino shapes, numbers and positions
+from grid_engine import GridEngine, tile_exponent  # # Used for the game rules
+from shapes import SHAPE_CELLS, ROTATION_TABLES  # # Used for the tetromino shapes
+
+# # A tetromino without any drawing: its shape, the numbers on its tiles (in the order of
+# # the rotation table cells) and the column it spawns at
+class Piece:
+    def __init__(self, shape, numbers, spawn_x):
+        self.type = shape
+        self.numbers = numbers
+        self.spawn_x = spawn_x
+        self.n = SHAPE_CELLS[shape][0]
+        self.rotation_tables = ROTATION_TABLES[shape]
+
+    def get_exponents(self):
+        # # Returns the exponents of the tiles as stored on the board
+        return [tile_exponent(number) for number in self.numbers]
+
+# # A game of Tetris 2048 without window, input or timing: each step places the current
+# # piece by its final rotation and column, as bots and simulations choose them
+class HeadlessGame:
+    def __init__(self, grid_h=20, grid_w=12, seed=None, bag=False, recorder=None):
+        # # Initialize the rules engine, the random source and the first two pieces
+        # # (a recorder, e.g. a replay.Replay, gets record(tick, rotation, x, y, engine) before every lock)
+        self.engine = GridEngine(grid_h, grid_w)
+        self.rng = GameRandom(seed, bag)
+        self.recorder = recorder
+        self.pieces_placed = 0  # # Number of pieces locked so far
+        self.current_piece = self.create_piece()
+        self.next_piece = self.create_piece()
+
+    @property
+    def game_over(self):
+        return self.engine.game_over
+
+    def copy(self):
+        # # Returns an independent copy of the game (without the recorder)
+        game = HeadlessGame.__new__(HeadlessGame)  # # Skips __init__, every attribute is set below
+        game.engine = self.engine.copy()
+        game.rng = copy.deepcopy(self.rng)
+        game.recorder = None
+        game.pieces_placed = self.pieces_placed
+        game.current_piece = self.current_piece
+        game.next_piece = self.next_piece
+        return game
+
+    def create_piece(self):
+        # # Randomly creates a piece the same way the interactive game creates tetrominoes
+        # # (so the same seed gives the same pieces in both)
+        shape = self.rng.next_shape()
+        n = SHAPE_CELLS[shape][0]
+        numbers = self.rng.next_numbers()
+        spawn_x = self.rng.next_spawn_x(n, self.engine.grid_width)
+        return Piece(shape, numbers, spawn_x)
+
+    def fits(self, piece, rotation, x, y):
+        # # Returns True if the piece fits at the given position (inside the grid, no overlap)
+        table = piece.rotation_tables[rotation]
+        if y + table.n - 1 - table.min_row >= self.engine.grid_height:
+            return False
+        return not self.engine.collides(table, x, y)
+
+    def can_place(self, rotation, x, piece=None):
+        # # Returns True if the piece can reach the given rotation and column from its spawn
+        # # position (rotated in place first, then moved sideways at the spawn height)
+        piece = piece or self.current_piece
+        spawn_y = self.engine.grid_height - piece.n
+        for r in range(rotation + 1):
+            if not self.fits(piece, r, piece.spawn_x, spawn_y):
+                return False
+        step = 1 if x > piece.spawn_x else -1
+        for column in range(piece.spawn_x + step, x + step, step):
+            if not self.fits(piece, rotation, column, spawn_y):
+                return False
+        return True
+
+    def get_legal_placements(self, piece=None):
+        # # Returns all (rotation, column) placements the piece can reach
+        piece = piece or self.current_piece
+        placements = []
+        for rotation, table in enumerate(piece.rotation_tables):
+            for x in range(-table.min_col, self.engine.grid_width - table.max_col):
+                if self.can_place(rotation, x, piece):
+                    placements.append((rotation, x))
+        return placements
+
+    def place(self, rotation, x):
+        # # Drops the current piece with the given rotation at the given column and locks it
+        # # Returns False if the placement cannot be reached
+        piece = self.current_piece
+        if self.game_over or not self.can_place(rotation, x):
+            return False
+
+        table = piece.rotation_tables[rotation]
+        y = self.engine.grid_height - piece.n
+        y -= self.engine.drop_distance(table, x, y)
+        self.lock(rotation, x, y)
+        return True
+
+    def lock(self, rotation, x, y):
+        # # Locks the current piece with the given rotation and bottom left cell (without checking
+        # # that it can get there, e.g. when replaying a recorded game) and switches to the next one
+        piece = self.current_piece
+        if self.recorder is not None:
+            self.recorder.record(self.pieces_placed + 1, rotation, x, y, self.engine)
+        self.engine.lock_piece(piece.rotation_tables[rotation], x, y, piece.get_exponents())
+        self.pieces_placed += 1
+
+        # # Switch to the next piece, the game is over when it cannot even spawn
+        self.current_piece = self.next_piece
+        self.next_piece = self.create_piece()
+        if not self.game_over and not self.can_place(0, self.current_piece.spawn_x):
+            self.engine.game_over = True
+
+    def get_stats(self):
+        # # Returns the statistics of this game
+        return {
+            "score": self.engine.score,
+            "max_tile": 1 << int(self.engine.board.max()) if self.engine.board.any() else 0,
+            "pieces_placed": self.pieces_placed,
+            "lines_cleared": self.engine.lines_cleared,
+            "merges": self.engine.merge_count,
+        }
@@ -0,0 +1,390 @@
+"""
+offscreen.py
+
+The offscreen module is a rendering backend with the stddraw functions
+used by the game that draws onto an in-memory pygame Surface instead of
+a window. It uses the SDL dummy drivers, so it also works on machines
+without a display, and show() does not wait or poll any events.
+
+Call install() before importing the game modules to make them draw
+offscreen (it registers this module as lib.stddraw), then read the
+canvas with get_surface(), get_pixels() or save().
+"""
+
+#-----------------------------------------------------------------------
+
+import os
+import sys
+import types
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+import pygame
+import pygame.surfarray
+
+try:
+    import lib.color as color
+except ModuleNotFoundError:
+    import color
+
+#-----------------------------------------------------------------------
+
+# Default sizes and values (as in stddraw)
+
+_DEFAULT_CANVAS_SIZE = 512
+_DEFAULT_XMIN = 0.0
+_DEFAULT_XMAX = 1.0
+_DEFAULT_YMIN = 0.0
+_DEFAULT_YMAX = 1.0
+_DEFAULT_PEN_RADIUS = .005
+_DEFAULT_PEN_COLOR = color.Color(0, 0, 0)
+_DEFAULT_FONT_FAMILY = 'Helvetica'
+_DEFAULT_FONT_SIZE = 12
+
+_xmin = None
+_ymin = None
+_xmax = None
+_ymax = None
+_fontFamily = _DEFAULT_FONT_FAMILY
+_fontSize = _DEFAULT_FONT_SIZE
+_canvasWidth = float(_DEFAULT_CANVAS_SIZE)
+_canvasHeight = float(_DEFAULT_CANVAS_SIZE)
+_penRadius = None
+_penColor = _DEFAULT_PEN_COLOR
+
+# The canvas and the fonts rendered so far, keyed by (family, size)
+_surface = None
+_fonts = {}
+
+# Functions called with the canvas on every show(), e.g. to capture
+# the frames
+_showListeners = []
+
+#-----------------------------------------------------------------------
+
+def _pygameColor(c):
+    """
+    Convert c, an object of type color.Color, to a pygame color.
+    """
+    return pygame.Color(c.getRed(), c.getGreen(), c.getBlue())
+
+def _scaleX(x):
+    return _canvasWidth * (x - _xmin) / (_xmax - _xmin)
+
+def _scaleY(y):
+    return _canvasHeight * (_ymax - y) / (_ymax - _ymin)
+
+def _factorX(w):
+    return w * _canvasWidth / abs(_xmax - _xmin)
+
+def _factorY(h):
+    return h * _canvasHeight / abs(_ymax - _ymin)
+
+def _userX(x):
+    return _xmin + x * (_xmax - _xmin) / _canvasWidth
+
+def _userY(y):
+    return _ymax - y * (_ymax - _ymin) / _canvasHeight
+
+def _lineWidth():
+    """
+    Return the width in pixels of the lines drawn with the current
+    pen radius.
+    """
+    return max(1, int(round(2.0 * _penRadius)))
+
+#-----------------------------------------------------------------------
+
+def setCanvasSize(w=_DEFAULT_CANVAS_SIZE, h=_DEFAULT_CANVAS_SIZE):
+    """
+    Set the size of the canvas to w pixels wide and h pixels high
+    (a new canvas is created, nothing is drawn on it yet).
+    """
+    global _canvasWidth, _canvasHeight, _surface
+    if (w < 1) or (h < 1):
+        raise Exception('width and height must be positive')
+    _canvasWidth = float(w)
+    _canvasHeight = float(h)
+    _surface = pygame.Surface((w, h))
+    _surface.fill(pygame.Color(255, 255, 255))
+
+def setXscale(min=_DEFAULT_XMIN, max=_DEFAULT_XMAX):
+    """
+    Set the x-scale of the canvas such that the minimum x value
+    is min and the maximum x value is max.
+    """
+    global _xmin, _xmax
+    _xmin = float(min)
+    _xmax = float(max)
+
+def setYscale(min=_DEFAULT_YMIN, max=_DEFAULT_YMAX):
+    """
+    Set the y-scale of the canvas such that the minimum y value
+    is min and the maximum y value is max.
+    """
+    global _ymin, _ymax
+    _ymin = float(min)
+    _ymax = float(max)
+
+def setPenRadius(r=_DEFAULT_PEN_RADIUS):
+    """
+    Set the pen radius to r, thus affecting the subsequent drawing
+    of points and lines.
+    """
+    global _penRadius
+    if float(r) < 0.0:
+        raise Exception('Argument to setPenRadius() must be non-neg')
+    _penRadius = r * float(_DEFAULT_CANVAS_SIZE)
+
+def setPenColor(c=_DEFAULT_PEN_COLOR):
+    """
+    Set the pen color to c, where c is an object of class color.Color.
+    """
+    global _penColor
+    _penColor = c
+
+def setFontFamily(f=_DEFAULT_FONT_FAMILY):
+    """
+    Set the font family to f (e.g. 'Helvetica' or 'Courier').
+    """
+    global _fontFamily
+    _fontFamily = f
+
+def setFontSize(s=_DEFAULT_FONT_SIZE):
+    """
+    Set the font size to s (e.g. 12 or 16).
+    """
+    global _fontSize
+    _fontSize = s
+
+#-----------------------------------------------------------------------
+
+def _makeSureCanvasExists():
+    """
+    Create the canvas with the default size and scales if no canvas
+    has been created yet.
+    """
+    if _surface is None:
+        setCanvasSize()
+    if _xmin is None:
+        setXscale()
+    if _ymin is None:
+        setYscale()
+    if _penRadius is None:
+        setPenRadius()
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+#-----------------------------------------------------------------------
+
+def clear(c=color.Color(255, 255, 255)):
+    """
+    Clear the canvas to color c, where c is an object of class
+    color.Color.
+    """
+    _makeSureCanvasExists()
+    _surface.fill(_pygameColor(c))
+
+def pixel(x, y):
+    """
+    Draw on the canvas a pixel at (x, y).
+    """
+    _makeSureCanvasExists()
+    _surface.fill(_pygameColor(_penColor), pygame.Rect(int(round(_scaleX(x))), int(round(_scaleY(y))), 1, 1))
+
+def point(x, y):
+    """
+    Draw on the canvas a point at (x, y).
+    """
+    _makeSureCanvasExists()
+    if _penRadius <= 1.0:
+        pixel(x, y)
+    else:
+        filledCircle(x, y, _userX(_penRadius) - _userX(0))
+
+def line(x0, y0, x1, y1):
+    """
+    Draw on the canvas a line from (x0, y0) to (x1, y1).
+    """
+    _makeSureCanvasExists()
+    pygame.draw.line(_surface, _pygameColor(_penColor), (_scaleX(x0), _scaleY(y0)),
+                     (_scaleX(x1), _scaleY(y1)), _lineWidth())
+
+def circle(x, y, r):
+    """
+    Draw on the canvas a circle of radius r centered on (x, y).
+    """
+    _makeSureCanvasExists()
+    ws = _factorX(2.0 * r)
+    hs = _factorY(2.0 * r)
+    pygame.draw.ellipse(_surface, _pygameColor(_penColor),
+                        pygame.Rect(_scaleX(x) - ws / 2.0, _scaleY(y) - hs / 2.0, ws, hs), _lineWidth())
+
+def filledCircle(x, y, r):
+    """
+    Draw on the canvas a filled circle of radius r centered on (x, y).
+    """
+    _makeSureCanvasExists()
+    ws = _factorX(2.0 * r)
+    hs = _factorY(2.0 * r)
+    pygame.draw.ellipse(_surface, _pygameColor(_penColor),
+                        pygame.Rect(_scaleX(x) - ws / 2.0, _scaleY(y) - hs / 2.0, ws, hs), 0)
+
+def rectangle(x, y, w, h):
+    """
+    Draw on the canvas a rectangle of width w and height h whose
+    lower left point is (x, y).
+    """
+    _makeSureCanvasExists()
+    ws = _factorX(w)
+    hs = _factorY(h)
+    pygame.draw.rect(_surface, _pygameColor(_penColor), pygame.Rect(_scaleX(x), _scaleY(y) - hs, ws, hs),
+                     _lineWidth())
+
+def filledRectangle(x, y, w, h):
+    """
+    Draw on the canvas a filled rectangle of width w and height h
+    whose lower left point is (x, y).
+    """
+    _makeSureCanvasExists()
+    ws = _factorX(w)
+    hs = _factorY(h)
+    pygame.draw.rect(_surface, _pygameColor(_penColor), pygame.Rect(_scaleX(x), _scaleY(y) - hs, ws, hs), 0)
+
+def square(x, y, r):
+    """
+    Draw on the canvas a square whose sides are of length 2r, centered
+    on (x, y).
+    """
+    rectangle(x - r, y - r, 2.0 * r, 2.0 * r)
+
+def filledSquare(x, y, r):
+    """
+    Draw on the canvas a filled square whose sides are of length 2r,
+    centered on (x, y).
+    """
+    filledRectangle(x - r, y - r, 2.0 * r, 2.0 * r)
+
+def text(x, y, s):
+    """
+    Draw string s on the canvas centered at (x, y).
+    """
+    _makeSureCanvasExists()
+    key = (_fontFamily, _fontSize)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(_fontFamily, _fontSize)
+    rendered = font.render(s, True, _pygameColor(_penColor))
+    _surface.blit(rendered, rendered.get_rect(center=(_scaleX(x), _scaleY(y))))
+
+def picture(pic, x=None, y=None):
+    """
+    Draw pic on the canvas centered at (x, y), where pic is an object
+    of class picture.Picture (centered on the canvas by default).
+    """
+    _makeSureCanvasExists()
+    if x is None:
+        x = (_xmax + _xmin) / 2.0
+    if y is None:
+        y = (_ymax + _ymin) / 2.0
+    ws = pic.width()
+    hs = pic.height()
+    _surface.blit(pic._surface, [_scaleX(x) - ws / 2.0, _scaleY(y) - hs / 2.0, ws, hs])
+
+#-----------------------------------------------------------------------
+
+def show(msec=0.0):
+    """
+    Finish a frame: pass the canvas to the show listeners. Nothing is
+    displayed and, unlike stddraw, msec is ignored (offscreen frames
+    are not paced).
+    """
+    _makeSureCanvasExists()
+    for listener in _showListeners:
+        listener(_surface)
+
+def addShowListener(listener):
+    """
+    Call listener with the canvas (a pygame Surface) on every show().
+    """
+    _showListeners.append(listener)
+
+def removeShowListener(listener):
+    """
+    Stop calling listener on show().
+    """
+    _showListeners.remove(listener)
+
+def save(f):
+    """
+    Save the canvas to the file whose name is f (e.g. a .png file).
+    """
+    _makeSureCanvasExists()
+    pygame.image.save(_surface, f)
+
+def get_surface():
+    """
+    Return the canvas, a pygame Surface.
+    """
+    _makeSureCanvasExists()
+    return _surface
+
+def get_pixels():
+    """
+    Return a (height, width, 3) NumPy array of the RGB values of the
+    canvas (a copy).
+    """
+    _makeSureCanvasExists()
+    return pygame.surfarray.array3d(_surface).transpose(1, 0, 2)
+
+#-----------------------------------------------------------------------
+
+# Without a window there are no keyboard or mouse events
+
+def hasNextKeyTyped():
+    return False
+
+def nextKeyTyped():
+    raise Exception('No keys are typed on an offscreen canvas')
+
+def clearKeysTyped():
+    pass
+
+def mousePressed():
+    return False
+
+def mouseX():
+    return 0.0
+
+def mouseY():
+    return 0.0
+
+#-----------------------------------------------------------------------
+
+def install():
+    """
+    Register this module as lib.stddraw (and the top-level color and
+    picture modules as lib.color and lib.picture when the lib package
+    does not provide them), so that the game modules imported after
+    this call draw offscreen.
+    """
+    package = sys.modules.get('lib')
+    if package is None:
+        try:
+            import lib as package
+        except ModuleNotFoundError:
+            package = types.ModuleType('lib')
+            package.__path__ = []
+            sys.modules['lib'] = package
+    sys.modules['lib.stddraw'] = sys.modules[__name__]
+    package.stddraw = sys.modules[__name__]
+    for name in ('color', 'picture'):
+        full_name = 'lib.' + name
+        if full_name not in sys.modules:
+            try:
+                __import__(full_name)
+            except ModuleNotFoundError:
+                module = __import__(name)
+                sys.modules[full_name] = module
+                setattr(package, name, module)
@@ -14,6 +14,8 @@ except ModuleNotFoundError:
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
 import pygame
+import pygame.surfarray
+import numpy as np
 
 #-----------------------------------------------------------------------
 
@@ -98,3 +100,50 @@ class Picture:
         """
         pygameColor = pygame.Color(c.getRed(), c.getGreen(), c.getBlue(), 0)
         self._surface.set_at((x, y), pygameColor)
+
+    #-------------------------------------------------------------------
+
+    def _makeArrayAccessible(self):
+        """
+        Convert self to 32 bits per pixel if its pixels cannot be viewed
+        as an RGB array (e.g. a palette image).
+        """
+        if self._surface.get_bytesize() < 3:
+            surface = pygame.Surface(self._surface.get_size(), 0, 32)
+            surface.blit(self._surface, (0, 0))
+            self._surface = surface
+
+    #-------------------------------------------------------------------
+
+    def getPixels(self, x=0, y=0, w=None, h=None):
+        """
+        Return a NumPy view of the RGB values of the w-by-h region of
+        self whose upper left pixel is (x, y), the whole of self by
+        default. The view has shape (h, w, 3) and dtype uint8, so
+        view[j, i] is the color at (x + i, y + j), and writing to it
+        changes self directly. The view locks self: delete it before
+        drawing self.
+        """
+        self._makeArrayAccessible()
+        if w is None:
+            w = self.width() - x
+        if h is None:
+            h = self.height() - y
+        pixels = pygame.surfarray.pixels3d(self._surface)
+        return pixels[x:x + w, y:y + h].transpose(1, 0, 2)
+
+    #-------------------------------------------------------------------
+
+    def setPixels(self, a, x=0, y=0):
+        """
+        Set the RGB values of the region of self whose upper left pixel
+        is (x, y) to a, an array of shape (h, w, 3) as returned by
+        getPixels(). Values outside 0 to 255 are clipped.
+        """
+        a = np.asarray(a)
+        view = self.getPixels(x, y, a.shape[1], a.shape[0])
+        if a.dtype == np.uint8:
+            view[...] = a
+        else:
+            view[...] = np.clip(a, 0, 255)
+        del view
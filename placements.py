@@ -0,0 +1,80 @@
+# Import necessary libraries
+from grid_engine import tile_exponent  # # Used for converting tile numbers to board exponents
+
+# # Enumerates the final positions a tetromino can reach: from its current position it is
+# # rotated clockwise in place, moved sideways at the same height and then dropped (the
+# # same moves as HeadlessGame.can_place), with the drops computed from the bitboards
+
+def get_rotation_keys(rotation_tables, exponents):
+    # # Returns for each rotation the first rotation that locks exactly the same tiles (the
+    # # same cells in the bounding box with the same numbers on them), so symmetric rotations
+    # # such as those of O, I, S and Z are only enumerated once
+    keys = []
+    for table in rotation_tables:
+        keys.append(tuple(sorted((row - table.min_row, col - table.min_col, exponent)
+                                 for (row, col), exponent in zip(table.cells, exponents))))
+    return [keys.index(key) for key in keys]
+
+def fits(engine, table, x, y):
+    # # Returns True if the rotation fits at the given position (below the top of the grid,
+    # # inside the walls and without overlapping a tile)
+    if y + table.n - 1 - table.min_row >= engine.grid_height:
+        return False
+    return not engine.collides(table, x, y)
+
+def iter_placements(engine, rotation_tables, exponents, x, y, rotation=0):
+    # # Yields (rotation, column, landing_y) for each distinct final position of a tetromino with
+    # # its bottom left cell at (x, y) in the given rotation; generated lazily, so a search can
+    # # stop early
+    rotation_keys = get_rotation_keys(rotation_tables, exponents)
+    seen = set()  # # (rotation key, leftmost grid column) of the placements yielded so far
+    for step in range(4):
+        current = (rotation + step) % 4
+        table = rotation_tables[current]
+        # # Rotating further has to pass through this rotation state
+        if not fits(engine, table, x, y):
+            return
+
+        # # Columns reachable by moving left and right at the current height
+        first, last = x, x
+        while fits(engine, table, first - 1, y):
+            first -= 1
+        while fits(engine, table, last + 1, y):
+            last += 1
+
+        for column in range(first, last + 1):
+            key = (rotation_keys[current], column + table.min_col)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield current, column, y - engine.drop_distance(table, column, y)
+
+def iter_results(engine, rotation_tables, exponents, x, y, rotation=0):
+    # # Yields (rotation, column, result) for each placement of iter_placements, where result is
+    # # a headless copy of the engine with the tetromino locked (and the rows cleared, tiles
+    # # merged, ...)
+    for current, column, landing_y in iter_placements(engine, rotation_tables, exponents, x, y, rotation):
+        result = engine.copy()
+        result.lock_piece(rotation_tables[current], column, landing_y, exponents)
+        yield current, column, result
+
+def get_tetromino_start(tetromino):
+    # # Returns the (rotation tables, exponents, x, y, rotation) a Tetromino is enumerated from
+    exponents = [tile_exponent(tile.number) for tile in tetromino.tiles]
+    position = tetromino.bottom_left_cell
+    return tetromino.rotation_tables, exponents, position.x, position.y, tetromino.rotation
+
+def get_piece_start(engine, piece):
+    # # Returns the (rotation tables, exponents, x, y, rotation) a HeadlessGame piece is
+    # # enumerated from (its spawn position)
+    return piece.rotation_tables, piece.get_exponents(), piece.spawn_x, engine.grid_height - piece.n, 0
+
+def iter_tetromino_placements(grid, tetromino=None):
+    # # Yields the placements and resulting boards of a tetromino on a game grid
+    # # (grid.current_tetromino when no tetromino is given)
+    return iter_results(grid, *get_tetromino_start(tetromino or grid.current_tetromino))
+
+def iter_piece_placements(game, piece=None):
+    # # Yields the placements and resulting boards of a piece of a HeadlessGame from its spawn
+    # # position (game.current_piece when no piece is given)
+    return iter_results(game.engine, *get_piece_start(game.engine, piece or game.current_piece))
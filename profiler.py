@@ -0,0 +1,146 @@
+# Import necessary libraries
+import contextlib  # # For the no-op section of a disabled profiler
+import functools  # # For wrapping the instrumented methods
+import json  # # For dumping the timings
+import math  # # For the logarithmic histogram buckets
+import time  # # For measuring the phases
+
+# # Histogram of durations with logarithmic buckets from 1 us to 100 s (BUCKETS_PER_DECADE
+# # buckets per power of 10), so adding a sample is O(1) and the memory does not grow
+BUCKETS_PER_DECADE = 20
+MIN_EXPONENT, MAX_EXPONENT = -6, 2  # # Bucket range as powers of 10 seconds
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * ((MAX_EXPONENT - MIN_EXPONENT) * BUCKETS_PER_DECADE)
+        self.count = 0
+        self.total = 0.0  # # Sum of all durations in seconds
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        # # Adds a duration in seconds
+        if seconds > 0:
+            index = int((math.log10(seconds) - MIN_EXPONENT) * BUCKETS_PER_DECADE)
+            index = min(max(index, 0), len(self.counts) - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, q):
+        # # Returns the duration in seconds below which q percent of the samples are
+        # # (the geometric middle of the bucket it falls into)
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                return 10 ** (MIN_EXPONENT + (index + 0.5) / BUCKETS_PER_DECADE)
+        return self.maximum
+
+    def get_summary(self):
+        # # Returns the count and the mean, p50, p99 and max durations in milliseconds
+        return {"count": self.count, "mean_ms": self.total / max(self.count, 1) * 1000,
+                "p50_ms": self.percentile(50) * 1000, "p99_ms": self.percentile(99) * 1000,
+                "max_ms": self.maximum * 1000}
+
+# # Opt-in timing of the phases of the game loop and the rule steps: timings are added to a
+# # histogram per phase name, shown in an overlay and dumped periodically; a disabled profiler
+# # hands out a shared no-op section and instruments nothing, so it costs next to nothing
+class Profiler:
+    def __init__(self, enabled=False, dump_interval=10.0, dump_path=None):
+        self.enabled = enabled
+        self.dump_interval = dump_interval  # # Seconds between two dumps (None for no dumps)
+        self.dump_path = dump_path  # # JSON file to dump to, printed when not given
+        self.histograms = {}  # # Phase name -> Histogram
+        self.next_dump_time = time.perf_counter() + (dump_interval or 0)
+        self.overlay_interval = 0.5  # # Seconds between two overlay updates
+        self.overlay_lines = []
+        self.next_overlay_time = 0.0
+
+    def add(self, name, seconds):
+        # # Adds a duration in seconds to the histogram of a phase
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def section(self, name):
+        # # Returns a context manager timing the code inside it as the given phase
+        if not self.enabled:
+            return NULL_SECTION
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start_time)
+
+    def instrument(self, obj, method_names, prefix=""):
+        # # Times every call of the given methods of an object (wrapped on the object itself,
+        # # so other objects of its class are not affected); does nothing when disabled
+        if not self.enabled:
+            return
+        for method_name in method_names:
+            method = getattr(obj, method_name)
+            setattr(obj, method_name, self.wrap(method, prefix + method_name))
+
+    def wrap(self, method, name):
+        # # Returns the method wrapped to time its calls as the given phase
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start_time)
+        return timed_method
+
+    def get_summary(self):
+        # # Returns the summary of every phase histogram
+        return {name: histogram.get_summary() for name, histogram in sorted(self.histograms.items())}
+
+    def format_lines(self):
+        # # Returns one line per phase: name, p50 and p99 in milliseconds
+        return [f"{name}: {summary['p50_ms']:.2f} / {summary['p99_ms']:.2f} ms"
+                for name, summary in self.get_summary().items()]
+
+    def tick(self):
+        # # Dumps the timings when a dump is due (called once per loop iteration)
+        if not self.enabled or not self.dump_interval:
+            return
+        now = time.perf_counter()
+        if now >= self.next_dump_time:
+            self.next_dump_time = now + self.dump_interval
+            self.dump()
+
+    def dump(self):
+        # # Writes the timings to the dump file or prints them
+        if self.dump_path:
+            with open(self.dump_path, "w") as file:
+                json.dump(self.get_summary(), file, indent=2)
+        else:
+            print("phase: p50 / p99")
+            for line in self.format_lines():
+                print("  " + line)
+
+    def draw_overlay(self, grid, x, top_y, max_lines=7):
+        # # Draws the p50 / p99 of the phases on the canvas of a GameGrid, one line per phase
+        # # below top_y (the lines are refreshed every overlay_interval seconds)
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if now >= self.next_overlay_time:
+            self.next_overlay_time = now + self.overlay_interval
+            self.overlay_lines = ["p50 / p99 (ms)"] + self.format_lines()
+        for index, line in enumerate(self.overlay_lines[:max_lines]):
+            grid.draw_text_region(f"profile_{index}", x, top_y - index, line, 12, 7, 1)
+
+NULL_SECTION = contextlib.nullcontext()  # # Section handed out by disabled profilers
@@ -0,0 +1,234 @@
+# Import necessary libraries
+import argparse  # # For reading the command line options
+import contextlib  # # For keeping prints out of exported streams
+import struct  # # For the file header
+import sys  # # For reporting exports on stderr
+import time  # # For measuring the playback speed
+import zlib  # # For compressing the event stream and the snapshots
+import numpy as np  # # For storing the events and the snapshots as fixed-width records
+from headless_game import HeadlessGame  # # For re-simulating the games without a window
+
+# # Replay file layout: a fixed header followed by the zlib-compressed event records and the
+# # snapshot records; a game is fully given by its seed and the (tick, rotation, x, y) of every
+# # locked piece, the snapshots only make seeking fast
+MAGIC = b"T2RP"
+VERSION = 2
+# # magic, version, grid_h, grid_w, bag, seed, snapshot interval, counts, seconds per tick
+HEADER = struct.Struct("<4sBHHBQIIId")
+HEADER_V1 = struct.Struct("<4sBHHBQIII")  # # Version 1 had no tick interval, its games ran at 0.3 s per tick
+DEFAULT_TICK_INTERVAL = 0.3  # # Seconds per tick of an interactive game
+
+# # One locked piece: the tick it locked on (stored as the difference to the previous event, which
+# # compresses well), its rotation and the position of the bottom left cell of its tile matrix
+EVENT_DTYPE = np.dtype([("tick", "<u4"), ("rotation", "u1"), ("x", "i1"), ("y", "i1")])
+
+def get_snapshot_dtype(grid_h, grid_w):
+    # # Returns the record of a board snapshot taken before the event with the given index
+    return np.dtype([("index", "<u4"), ("score", "<i8"), ("lines_cleared", "<u4"), ("merges", "<u4"),
+                     ("board", "u1", (grid_h, grid_w))])
+
+# # Recording of one game: the seed and the locked pieces, with a snapshot of the board taken
+# # every snapshot_interval pieces (pass it as the recorder of a HeadlessGame or call record
+# # from the game loop) and the seconds per tick of the recorded game for playing it back
+class Replay:
+    def __init__(self, seed, grid_h=20, grid_w=12, bag=False, snapshot_interval=64,
+                 tick_interval=DEFAULT_TICK_INTERVAL):
+        self.seed = seed
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.bag = bag
+        self.snapshot_interval = snapshot_interval  # # 0 means no snapshots
+        self.tick_interval = tick_interval
+        self.events = []  # # (tick, rotation, x, y) of each locked piece
+        self.snapshots = []  # # (index, score, lines_cleared, merges, board) before every interval-th event
+
+    def record(self, tick, rotation, x, y, engine=None):
+        # # Records a piece locked on the given tick, the engine (before locking the piece) is
+        # # snapshotted when an interval of pieces has passed
+        index = len(self.events)
+        if engine is not None and self.snapshot_interval and index > 0 and index % self.snapshot_interval == 0:
+            self.snapshots.append((index, engine.score, engine.lines_cleared, engine.merge_count, engine.board.copy()))
+        self.events.append((tick, rotation, x, y))
+
+    def to_bytes(self):
+        # # Returns the binary replay
+        events = np.array(self.events, dtype=EVENT_DTYPE)
+        events["tick"][1:] -= events["tick"][:-1].copy()
+        snapshots = np.array(self.snapshots, dtype=get_snapshot_dtype(self.grid_height, self.grid_width))
+        header = HEADER.pack(MAGIC, VERSION, self.grid_height, self.grid_width, self.bag, self.seed,
+                             self.snapshot_interval, len(events), len(snapshots), self.tick_interval)
+        return header + zlib.compress(events.tobytes() + snapshots.tobytes(), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        # # Reads a binary replay
+        magic, version = struct.unpack_from("<4sB", data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("Not a Tetris 2048 replay (or an unsupported version)")
+        if version == 1:
+            header = HEADER_V1
+            tick_interval = DEFAULT_TICK_INTERVAL
+            _, _, grid_h, grid_w, bag, seed, interval, event_count, snapshot_count = header.unpack_from(data)
+        else:
+            header = HEADER
+            _, _, grid_h, grid_w, bag, seed, interval, event_count, snapshot_count, tick_interval = \
+                header.unpack_from(data)
+        body = zlib.decompress(data[header.size:])
+        events = np.frombuffer(body, EVENT_DTYPE, event_count)
+        snapshots = np.frombuffer(body, get_snapshot_dtype(grid_h, grid_w), snapshot_count, events.nbytes)
+
+        replay = cls(seed, grid_h, grid_w, bool(bag), interval, tick_interval)
+        ticks = np.cumsum(events["tick"], dtype=np.int64)
+        replay.events = list(zip(ticks.tolist(), events["rotation"].tolist(), events["x"].tolist(),
+                                 events["y"].tolist()))
+        replay.snapshots = [(int(s["index"]), int(s["score"]), int(s["lines_cleared"]), int(s["merges"]),
+                             s["board"].copy()) for s in snapshots]
+        return replay
+
+    def save(self, path):
+        # # Writes the replay to a file
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        # # Reads a replay from a file
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+    def seek(self, index=None):
+        # # Returns the headless game after the first index pieces (all of them by default) are locked,
+        # # re-simulated from the last snapshot before that point
+        if index is None:
+            index = len(self.events)
+        game = HeadlessGame(self.grid_height, self.grid_width, self.seed, self.bag)
+        start = 0
+        earlier = [snapshot for snapshot in self.snapshots if snapshot[0] <= index]
+        if earlier:
+            start = earlier[-1][0]
+            restore_snapshot(game, earlier[-1])
+
+        for tick, rotation, x, y in self.events[start:index]:
+            game.lock(rotation, x, y)
+        return game
+
+def skip_pieces(game, count):
+    # # Draws the given number of pieces from the random source of the game without locking them
+    for _ in range(count):
+        game.current_piece = game.next_piece
+        game.next_piece = game.create_piece()
+
+def restore_snapshot(game, snapshot):
+    # # Sets a freshly created headless game to the state of a snapshot (the pieces come from the
+    # # random streams, so skipping the locked ones restores them)
+    index, score, lines_cleared, merges, board = snapshot
+    skip_pieces(game, index - game.pieces_placed)
+    game.pieces_placed = index
+    engine = game.engine
+    engine.board[:] = board
+    engine.score = score
+    engine.lines_cleared = lines_cleared
+    engine.merge_count = merges
+    engine.mark_all_dirty()
+
+def play_on_grid(replay, speed=1.0, tick_interval=None, max_fps=60, clock=None, animations=True):
+    # # Renders a replay through GameGrid.display, one tick every tick_interval / speed seconds
+    # # (the seconds per tick of the recorded game by default) or on the ticks of the given
+    # # clock, e.g. a FrameClock that renders without waiting
+    import lib.stddraw as stddraw  # # Only needed when rendering
+    from game_grid import GameGrid
+    from game_clock import GameClock
+    from game_random import GameRandom
+    from tetromino import Tetromino
+    from Tetris_2048 import create_tetromino, draw_score
+
+    grid_h, grid_w = replay.grid_height, replay.grid_width
+    stddraw.setCanvasSize(32 * (grid_w + 8), 32 * grid_h)
+    stddraw.setXscale(-0.5, grid_w + 7.5)
+    stddraw.setYscale(-0.5, grid_h - 0.5)
+    Tetromino.grid_height = grid_h
+    Tetromino.grid_width = grid_w
+
+    # # The tetrominoes are created from the same random source as in the recorded game
+    grid = GameGrid(grid_h, grid_w, animations)
+    rng = GameRandom(replay.seed, replay.bag)
+    current_tetromino = create_tetromino(rng)
+    grid.next_tetromino = create_tetromino(rng)
+    tick_interval = tick_interval or replay.tick_interval
+    clock = clock or GameClock(tick_interval / speed, max_fps, max_ticks_per_frame=1 << 30)
+
+    index = 0
+    while index < len(replay.events) or grid.merge_animations:
+        clock.advance()
+        while index < len(replay.events) and replay.events[index][0] <= clock.tick_count:
+            # # Lock the tetromino where it was locked in the recorded game
+            tick, rotation, x, y = replay.events[index]
+            current_tetromino.rotation = rotation
+            current_tetromino.update_tile_matrix()
+            current_tetromino.bottom_left_cell.x = x
+            current_tetromino.bottom_left_cell.y = y
+            grid.update_grid(*current_tetromino.get_min_bounded_tile_matrix(True))
+            current_tetromino = grid.next_tetromino
+            grid.next_tetromino = create_tetromino(rng)
+            index += 1
+
+        if clock.should_render():
+            grid.display()
+            draw_score(grid, grid.score)
+            stddraw.show(0)
+        else:
+            clock.wait()
+    return grid
+
+def export_video(replay, path, fps=30, speed=1.0, tick_interval=None):
+    # # Renders a replay offscreen at the given frame rate (without waiting and without the merge
+    # # animations, so every export of a replay gives the same frames) and writes the frames to
+    # # path: "-" streams raw RGB to stdout, a pattern with % saves images (see capture.open_sink)
+    # # Returns the FrameCapture with the counts of the captured and dropped frames
+    import offscreen  # # Only needed when exporting
+    offscreen.install()
+    from capture import FrameCapture, open_sink
+    from game_clock import FrameClock
+
+    tick_interval = tick_interval or replay.tick_interval
+    capture = FrameCapture(open_sink(path))
+    # # Exports never drop frames: the game loop waits for the writer when the queue is full
+    listener = lambda surface: capture.grab(surface, block=True)
+    offscreen.addShowListener(listener)
+    try:
+        play_on_grid(replay, clock=FrameClock(tick_interval / speed, fps), animations=False)
+    finally:
+        offscreen.removeShowListener(listener)
+        capture.close()
+    return capture
+
+def main():
+    # # Command line entry point of the replay tool
+    parser = argparse.ArgumentParser(description="Play back a recorded Tetris 2048 game")
+    parser.add_argument("path", help="replay file")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed when rendering")
+    parser.add_argument("--headless", action="store_true", help="re-simulate without a window and print the stats")
+    parser.add_argument("--seek", type=int, default=None, help="stop after this many pieces (headless)")
+    parser.add_argument("--export", default=None,
+                        help="render offscreen to raw RGB (a file or - for stdout) or images (e.g. frames/%%05d.png)")
+    parser.add_argument("--fps", type=int, default=30, help="frames per second of the export")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    if args.export:
+        # # Prints go to stderr, stdout may be the exported stream
+        with contextlib.redirect_stdout(sys.stderr):
+            capture = export_video(replay, args.export, args.fps, args.speed)
+            print(f"{capture.captured} frames exported")
+    elif args.headless:
+        start_time = time.perf_counter()
+        game = replay.seek(args.seek)
+        elapsed = time.perf_counter() - start_time
+        print(f"seed {replay.seed}, {len(replay.events)} pieces, replayed in {elapsed * 1000:.1f} ms")
+        print(game.get_stats())
+    else:
+        play_on_grid(replay, args.speed)
+
+# # Program entry point
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# # Shapes of the seven tetrominoes and their precomputed rotation/collision tables
+# # (computed once at import, so moving and rotating only needs table lookups)
+
+# # All tetromino types
+SHAPE_TYPES = ['I', 'O', 'Z', 'T', 'J', 'L', 'S']
+
+# # Id of each shape (its position in SHAPE_TYPES), e.g. in the observations and the datasets
+SHAPE_IDS = {shape: index for index, shape in enumerate(SHAPE_TYPES)}
+
+# # Size n of the n x n tile matrix and the occupied (column_index, row_index) cells
+# # of each tetromino in its initial rotation state
+SHAPE_CELLS = {
+    'I': (4, [(1, 0), (1, 1), (1, 2), (1, 3)]),
+    'O': (2, [(0, 0), (1, 0), (0, 1), (1, 1)]),
+    'Z': (3, [(0, 1), (1, 1), (1, 2), (2, 2)]),
+    'T': (3, [(0, 1), (1, 1), (2, 1), (1, 2)]),
+    'J': (3, [(0, 0), (0, 1), (1, 1), (2, 1)]),
+    'L': (3, [(2, 0), (0, 1), (1, 1), (2, 1)]),
+    'S': (3, [(1, 1), (2, 1), (0, 2), (1, 2)]),
+}
+
+# # Lookup tables of one rotation state of a tetromino
+class RotationTable:
+    def __init__(self, n, cells):
+        # # n = size of the tile matrix, cells = (row, col) of each tile in the tile matrix,
+        # # listed in the same order for every rotation so that tile k keeps its number
+        self.n = n
+        self.cells = tuple(cells)
+
+        rows = sorted(set(row for row, _ in cells))
+        cols = sorted(set(col for _, col in cells))
+        # # Edge profile: the bottommost tile of each column (for the drop distance)
+        self.bottommost = tuple((max(r for r, c in cells if c == col), col) for col in cols)
+        # # Bounding box of the occupied cells in the tile matrix
+        self.min_row, self.max_row = rows[0], rows[-1]
+        self.min_col, self.max_col = cols[0], cols[-1]
+        # # Bitmask of the occupied columns of each row (bit col is set for a tile at col)
+        self.row_masks = tuple((row, sum(1 << c for r, c in cells if r == row)) for row in rows)
+
+def rotate_cells(n, cells):
+    # # Rotates (row, col) cells of an n x n matrix by 90 degrees clockwise
+    return [(col, n - 1 - row) for row, col in cells]
+
+def build_rotation_tables():
+    # # Builds the tables of the four rotation states of each tetromino type
+    tables = {}
+    for shape in SHAPE_TYPES:
+        n, occupied_cells = SHAPE_CELLS[shape]
+        cells = [(row, col) for col, row in occupied_cells]
+        tables[shape] = []
+        for _ in range(4):
+            tables[shape].append(RotationTable(n, cells))
+            cells = rotate_cells(n, cells)
+    return tables
+
+# # ROTATION_TABLES[shape][rotation] for rotation = 0, 1, 2, 3 (clockwise quarter turns)
+ROTATION_TABLES = build_rotation_tables()
@@ -0,0 +1,113 @@
+# Import necessary libraries
+import argparse  # # For reading the command line options
+import csv  # # For writing the statistics as CSV
+import importlib  # # For loading policies given as module:function
+import multiprocessing  # # For playing the games on all CPU cores
+import os  # # For the replay file paths
+import random  # # For the random policy
+import time  # # For measuring the throughput
+import numpy as np  # # For writing the statistics as columns
+from headless_game import HeadlessGame  # # For playing games without a window
+from replay import Replay  # # For recording the games
+from dataset import PositionRecorder, PositionWriter  # # For writing the positions of the games
+
+# # Statistics written for each game (one column each)
+STAT_COLUMNS = ["seed", "score", "max_tile", "pieces_placed", "lines_cleared", "merges"]
+
+def random_policy(game, rng):
+    # # Places the current piece at a random reachable rotation and column
+    return rng.choice(game.get_legal_placements())
+
+# # Built-in policies, other policies can be given as module:function
+POLICIES = {"random": random_policy}
+
+def load_policy(name):
+    # # Returns the policy function with the given name (a policy takes the game and a
+    # # random generator and returns the (rotation, column) to place the current piece at)
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, function_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def play_game(task):
+    # # Plays one seeded game until it is over (or max_pieces pieces are placed)
+    # # and saves it as a replay to replay_dir when it is given
+    # # Returns the statistics and, with record_positions set, the record array of its positions
+    seed, policy_name, grid_h, grid_w, max_pieces, bag, replay_dir, record_positions = task
+    policy = load_policy(policy_name)
+    # # Headless games lock one piece per tick, played back at the pace of the autoplayer
+    replay = Replay(seed, grid_h, grid_w, bag, tick_interval=1 / 60) if replay_dir else None
+    game = HeadlessGame(grid_h, grid_w, seed, bag, replay)
+    positions = PositionRecorder(game) if record_positions else None
+    rng = random.Random(seed)
+    while not game.game_over and game.pieces_placed < max_pieces:
+        rotation, column = policy(game, rng)
+        if not game.place(rotation, column):
+            break  # # The policy chose a placement that cannot be reached
+    if replay is not None:
+        replay.save(os.path.join(replay_dir, f"{seed}.t2r"))
+    stats = game.get_stats()
+    stats["seed"] = seed
+    return stats, positions.get_positions() if positions is not None else None
+
+def run_games(games, seed=0, policy="random", grid_h=20, grid_w=12, max_pieces=10000, workers=None, bag=False,
+              replay_dir=None, dataset=None):
+    # # Plays the seeded games seed, seed + 1, ... across a process pool
+    # # Returns the statistics as a dict of columns (one numpy array per statistic)
+    # # With dataset set to a path, the positions of the games are appended to that dataset
+    # # file as the games finish (one write per game)
+    if replay_dir:
+        os.makedirs(replay_dir, exist_ok=True)
+    tasks = [(seed + i, policy, grid_h, grid_w, max_pieces, bag, replay_dir, dataset is not None)
+             for i in range(games)]
+    writer = PositionWriter(dataset, grid_h, grid_w) if dataset is not None else None
+    results = []
+    with multiprocessing.Pool(workers) as pool:
+        chunk_size = max(1, games // (4 * (workers or multiprocessing.cpu_count())))
+        for stats, positions in pool.imap(play_game, tasks, chunk_size):
+            results.append(stats)
+            if writer is not None:
+                writer.append(positions)
+    if writer is not None:
+        writer.close()
+    return {name: np.array([stats[name] for stats in results], dtype=np.int64) for name in STAT_COLUMNS}
+
+def save_columns(columns, path):
+    # # Writes the statistics to a .npz file (one array per column) or to a .csv file
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(STAT_COLUMNS)
+            writer.writerows(zip(*(columns[name].tolist() for name in STAT_COLUMNS)))
+    else:
+        np.savez(path, **columns)
+
+def main():
+    # # Command line entry point of the batch simulator
+    parser = argparse.ArgumentParser(description="Play seeded Tetris 2048 games without a window")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--policy", default="random", help="built-in policy name or module:function")
+    parser.add_argument("--height", type=int, default=20, help="grid height")
+    parser.add_argument("--width", type=int, default=12, help="grid width")
+    parser.add_argument("--max-pieces", type=int, default=10000, help="pieces placed at most per game")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--bag", action="store_true", help="deal the shapes from shuffled bags of all 7 shapes")
+    parser.add_argument("--output", default="stats.npz", help="output file (.npz or .csv)")
+    parser.add_argument("--replays", default=None, help="directory to save each game to as <seed>.t2r")
+    parser.add_argument("--dataset", default=None, help="dataset file to append the positions of the games to")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    columns = run_games(args.games, args.seed, args.policy, args.height, args.width, args.max_pieces, args.workers,
+                        args.bag, args.replays, args.dataset)
+    elapsed = time.perf_counter() - start_time
+    save_columns(columns, args.output)
+
+    pieces = int(columns["pieces_placed"].sum())
+    print(f"{args.games} games, {pieces} pieces in {elapsed:.2f} s ({pieces / elapsed:.0f} pieces/s)")
+    print(f"mean score {columns['score'].mean():.1f}, best max tile {columns['max_tile'].max()}")
+
+# # Program entry point
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# Import necessary libraries
+import numpy as np  # # Used for the observation buffers
+from headless_game import HeadlessGame  # # Used for the game rules and the pieces
+from shapes import SHAPE_IDS  # # Used for numbering the tetromino shapes
+
+# # Gym-style environment around HeadlessGame: reset(seed) starts a game and step(action)
+# # places the current piece, where an action is a (rotation, column) placement as in
+# # HeadlessGame.place; observations are written into the same buffers on every call
+class TetrisEnv:
+    def __init__(self, grid_h=20, grid_w=12):
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.game = None
+        # # Observation buffers: the board as tile exponents (0 = empty, 1 = 2, 2 = 4, ...),
+        # # the ids of the current and next pieces and the exponents on their tiles
+        self.board = np.zeros((grid_h, grid_w), dtype=np.uint8)
+        self.piece_ids = np.zeros(2, dtype=np.int64)
+        self.piece_exponents = np.zeros((2, 4), dtype=np.uint8)
+        self.observation = {"board": self.board, "pieces": self.piece_ids, "exponents": self.piece_exponents}
+        self.info = {"legal": True, "lines_cleared": 0, "merges": 0}
+
+    def reset(self, seed=None):
+        # # Starts a new game and returns the first observation
+        self.game = HeadlessGame(self.grid_height, self.grid_width, seed)
+        self.write_observation()
+        return self.observation
+
+    def step(self, action):
+        # # Places the current piece by the given (rotation, column) action
+        # # Returns (observation, reward, done, info) where the reward is the score gained;
+        # # an unreachable placement leaves the game unchanged and sets info["legal"] to False
+        rotation, column = action
+        engine = self.game.engine
+        score = engine.score
+        self.info["legal"] = self.game.place(rotation, column)
+        self.info["lines_cleared"] = engine.lines_cleared
+        self.info["merges"] = engine.merge_count
+        self.write_observation()
+        return self.observation, engine.score - score, self.game.game_over, self.info
+
+    def get_legal_actions(self):
+        # # Returns the (rotation, column) placements the current piece can reach
+        return self.game.get_legal_placements()
+
+    def write_observation(self):
+        # # Copies the game state into the observation buffers
+        np.copyto(self.board, self.game.engine.board)
+        for index, piece in enumerate((self.game.current_piece, self.game.next_piece)):
+            self.piece_ids[index] = SHAPE_IDS[piece.type]
+            self.piece_exponents[index] = piece.get_exponents()
@@ -1,87 +1,37 @@
 from tile import Tile  # used for modeling each tile on the tetrominoes
 from point import Point  # used for tile positions
 import copy as cp  # the copy module is used for copying tiles and positions
-import random  # the random module is used for generating random values
 import numpy as np  # the fundamental Python module for scientific computing
-import random
+from shapes import SHAPE_CELLS, ROTATION_TABLES  # precomputed shape tables
 
 # A class for modeling tetrominoes with 3 out of 7 different types as I, O and Z
 class Tetromino:
    # the dimensions of the game grid (defined as class variables)
    grid_height, grid_width = None, None
 
-   # A constructor for creating a tetromino with a given shape (type)
-   def __init__(self, shape):
+   # A constructor for creating a tetromino with a given shape (type), the
+   # numbers on its tiles and its spawn column are drawn from the given random
+   # source of the game (a GameRandom object, see game_random.py)
+   def __init__(self, shape, rng):
       self.type = shape  # set the type of this tetromino
-      # determine the occupied (non-empty) cells in the tile matrix based on
-      # the shape of this tetromino (see the documentation given with this code)
-      occupied_cells = []
-      if self.type == 'I':
-         n = 4  # n = number of rows = number of columns in the tile matrix
-         # shape of the tetromino I in its initial rotation state
-         occupied_cells.append((1, 0))  # (column_index, row_index)
-         occupied_cells.append((1, 1))
-         occupied_cells.append((1, 2))
-         occupied_cells.append((1, 3))
-      elif self.type == 'O':
-         n = 2  # n = number of rows = number of columns in the tile matrix
-         # shape of the tetromino O in its initial rotation state
-         occupied_cells.append((0, 0))  # (column_index, row_index)
-         occupied_cells.append((1, 0))
-         occupied_cells.append((0, 1))
-         occupied_cells.append((1, 1))
-      elif self.type == 'Z':
-         n = 3  # n = number of rows = number of columns in the tile matrix
-         # shape of the tetromino Z in its initial rotation state
-         occupied_cells.append((0, 1))  # (column_index, row_index)
-         occupied_cells.append((1, 1))
-         occupied_cells.append((1, 2))
-         occupied_cells.append((2, 2))
-
-      
-      elif self.type == 'T':
-         n = 3
-         occupied_cells.append((0, 1))
-         occupied_cells.append((1, 1))
-         occupied_cells.append((2, 1))
-         occupied_cells.append((1, 2))
-
-      elif self.type == 'J':
-         n = 3
-         occupied_cells.append((0, 0))
-         occupied_cells.append((0, 1))
-         occupied_cells.append((1, 1))
-         occupied_cells.append((2, 1))
-
-      elif self.type == 'L':
-         n = 3
-         occupied_cells.append((2, 0))
-         occupied_cells.append((0, 1))
-         occupied_cells.append((1, 1))
-         occupied_cells.append((2, 1))
-
-      elif self.type == 'S':
-         n = 3
-         occupied_cells.append((1, 1))
-         occupied_cells.append((2, 1))
-         occupied_cells.append((0, 2))
-         occupied_cells.append((1, 2))
-
-      # create a matrix of numbered tiles based on the shape of this tetromino
-      self.tile_matrix = np.full((n, n), None)
-      # create the four tiles (minos) of this tetromino and place these tiles
-      # into the tile matrix
-      for i in range(len(occupied_cells)):
-         col_index, row_index = occupied_cells[i][0], occupied_cells[i][1]
-
-         random_number= random.choice([2,4])
+      # the occupied (non-empty) cells in the tile matrix and the precomputed
+      # rotation tables of the shape of this tetromino (see shapes.py)
+      n, occupied_cells = SHAPE_CELLS[self.type]
+      self.rotation_tables = ROTATION_TABLES[self.type]
+      self.rotation = 0  # index of the current rotation state in the tables
+      # create the four tiles (minos) of this tetromino, tile k is placed on
+      # the k-th cell of the current rotation table
+      self.tiles = []
+      for random_number in rng.next_numbers():
          # create a tile for each occupied cell of this tetromino
-         self.tile_matrix[row_index][col_index] = Tile(random_number)
+         self.tiles.append(Tile(random_number))
+      # create a matrix of numbered tiles based on the shape of this tetromino
+      self.update_tile_matrix()
       # initialize the position of this tetromino (as the bottom left cell in
       # the tile matrix) with a random horizontal position above the game grid
       self.bottom_left_cell = Point()
       self.bottom_left_cell.y = Tetromino.grid_height - n
-      self.bottom_left_cell.x = random.randint(0, Tetromino.grid_width - n)
+      self.bottom_left_cell.x = rng.next_spawn_x(n, Tetromino.grid_width)
 
    # A method that computes and returns the position of the cell in the tile
    # matrix specified by the given row and column indexes
@@ -94,23 +44,23 @@ class Tetromino:
       position.y = self.bottom_left_cell.y + (n - 1) - row
       return position
 
+   # A method that places the tiles into the tile matrix of the current
+   # rotation state (the matrix is only used for drawing and locking)
+   def update_tile_matrix(self):
+      table = self.rotation_tables[self.rotation]
+      self.tile_matrix = np.full((table.n, table.n), None)
+      for (row, col), tile in zip(table.cells, self.tiles):
+         self.tile_matrix[row][col] = tile
+
    # A method to return a copy of the tile matrix without any empty row/column,
    # and the position of the bottom left cell when return_position is set
    def get_min_bounded_tile_matrix(self, return_position=False):
       n = len(self.tile_matrix)  # n = number of rows = number of columns
-      # determine rows and columns to copy (omit empty rows and columns)
-      min_row, max_row, min_col, max_col = n - 1, 0, n - 1, 0
-      for row in range(n):
-         for col in range(n):
-            if self.tile_matrix[row][col] is not None:
-               if row < min_row:
-                  min_row = row
-               if row > max_row:
-                  max_row = row
-               if col < min_col:
-                  min_col = col
-               if col > max_col:
-                  max_col = col
+      # rows and columns to copy (omit empty rows and columns) are given by
+      # the bounding box in the rotation table
+      table = self.rotation_tables[self.rotation]
+      min_row, max_row = table.min_row, table.max_row
+      min_col, max_col = table.min_col, table.max_col
       # copy the tiles from the tile matrix of this tetromino
       copy = np.full((max_row - min_row + 1, max_col - min_col + 1), None)
       for row in range(min_row, max_row + 1):
@@ -157,77 +107,41 @@ class Tetromino:
          self.bottom_left_cell.y -= 1
       return True  # a successful move in the given direction
    
-   def rotate(self, game_grid):
-    # (rotate 90 derece clockwise)
-    rotated_matrix = np.rot90(self.tile_matrix, -1)
-    n = len(rotated_matrix)
-    
-    # position control with matrix
-    for row in range(n):
-        for col in range(n):
-            tile = rotated_matrix[row][col]
-            if tile is not None:
-                pos = Point()
-                pos.x = self.bottom_left_cell.x + col
-                pos.y = self.bottom_left_cell.y + (n - 1) - row
-
-                # merge check
-                if not game_grid.is_inside(pos.y, pos.x):
-                    return  # rotate successfull
-                if game_grid.is_occupied(pos.y, pos.x):
-                    return  
+   # A method for dropping this tetromino straight down as far as it can fall
+   # (the drop distance is computed from the bitboards of the game grid)
+   def hard_drop(self, game_grid):
+      table = self.rotation_tables[self.rotation]
+      distance = game_grid.drop_distance(table, self.bottom_left_cell.x,
+                                         self.bottom_left_cell.y)
+      self.bottom_left_cell.y -= distance
+      return distance  # the number of rows this tetromino has fallen
 
-    # rotation applyingg
-    self.tile_matrix = rotated_matrix
+   # A method for rotating this tetromino by 90 degrees clockwise when the
+   # rotated tetromino stays inside the game grid without any overlap
+   def rotate(self, game_grid):
+      next_rotation = (self.rotation + 1) % 4
+      table = self.rotation_tables[next_rotation]
+      x, y = self.bottom_left_cell.x, self.bottom_left_cell.y
+      # the rotated tetromino must stay below the top of the game grid and
+      # must not collide with the walls, the bottom or the locked tiles
+      if y + table.n - 1 - table.min_row >= game_grid.grid_height:
+         return
+      if game_grid.collides(table, x, y):
+         return
+      # apply the rotation
+      self.rotation = next_rotation
+      self.update_tile_matrix()
 
    # A method for checking if this tetromino can be moved in a given direction
+   # (collisions are tested on the bitboards of the game grid)
    def can_be_moved(self, direction, game_grid):
-      n = len(self.tile_matrix)  # n = number of rows = number of columns
-      # check for moving left or right
-      if direction == "left" or direction == "right":
-         for row_index in range(n):
-            for col_index in range(n):
-               # direction = left  check the leftmost tile of each row
-               row, col = row_index, col_index
-               if direction == "left" and self.tile_matrix[row][col] is not None:
-                  # the position of the leftmost tile of the current row
-                  leftmost = self.get_cell_position(row, col)
-                  # if any leftmost tile is at x = 0
-                  if leftmost.x == 0:
-                     return False  # this tetromino cannot be moved left
-                  # if the grid cell on the left of a leftmost tile is occupied
-                  if game_grid.is_occupied(leftmost.y, leftmost.x - 1):
-                     return False  # this tetromino cannot be moved left
-                  # as the leftmost tile of the current row is checked
-                  break  # end the inner for loop
-               # direction = right check the rightmost tile of each row
-               row, col = row_index, n - 1 - col_index
-               if direction == "right" and self.tile_matrix[row][col] is not None:
-                  # the position of the rightmost tile of the current row
-                  rightmost = self.get_cell_position(row, col)
-                  # if any rightmost tile is at x = grid_width - 1
-                  if rightmost.x == Tetromino.grid_width - 1:
-                     return False  # this tetromino cannot be moved right
-                  # if the grid cell on the right of a rightmost tile is occupied
-                  if game_grid.is_occupied(rightmost.y, rightmost.x + 1):
-                     return False  # this tetromino cannot be moved right
-                  # as the rightmost tile of the current row is checked
-                  break  # end the inner for loop
-      # if direction = down check the bottommost tile of each column
-      else:
-         for col in range(n):
-            for row in range(n - 1, -1, -1):
-               # if the current cell of the tetromino is occupied by a tile
-               if self.tile_matrix[row][col] is not None:
-                  # the position of the bottommost tile of the current col
-                  bottommost = self.get_cell_position(row, col)
-                  # if any bottommost tile is at y = 0
-                  if bottommost.y == 0:
-                     return False  # this tetromino cannot be moved down
-                  # if the grid cell below any bottommost tile is occupied
-                  if game_grid.is_occupied(bottommost.y - 1, bottommost.x):
-                     return False  # this tetromino cannot be moved down
-                  # as the bottommost tile of the current row is checked
-                  break  # end the inner for loop
-      # if this method does not end by returning False before this line
-      return True  # this tetromino can be moved in the given direction
+      table = self.rotation_tables[self.rotation]
+      x, y = self.bottom_left_cell.x, self.bottom_left_cell.y
+      if direction == "left":
+         x -= 1
+      elif direction == "right":
+         x += 1
+      else:  # direction == "down"
+         y -= 1
+      # this tetromino can be moved when it does not collide at the new position
+      return not game_grid.collides(table, x, y)
@@ -1,5 +1,23 @@
 import lib.stddraw as stddraw  # used for drawing the tiles to display them
 from lib.color import Color  # used for coloring the tiles
+import pygame  # used for caching the rendered tiles as sprites
+
+# background colors of the tiles (defined once instead of on every draw)
+TILE_COLORS = {
+    2: Color(173, 216, 230),    # soft blue
+    4: Color(100, 149, 237),    # darker blue
+    8: Color(144, 238, 144),    # soft green
+    16: Color(60, 179, 113),    # green
+    32: Color(255, 223, 0),     # yellow
+    64: Color(255, 165, 0),     # orange
+    128: Color(255, 99, 71),    # likely orange
+    256: Color(255, 69, 0),     # bright red
+    512: Color(255, 0, 0),      # red
+    1024: Color(148, 0, 211),   # purple
+    2048: Color(75, 0, 130)     # purple + dark blue
+}
+DEFAULT_TILE_COLOR = Color(60, 58, 50)  # for the numbers above 2048
+FLASH_COLOR = Color(255, 255, 255)  # background color of a flashing (merging) tile
 
 # A class for modeling numbered tiles as in 2048
 class Tile:
@@ -9,6 +27,9 @@ class Tile:
    boundary_thickness = 0.004
    # font family and font size used for displaying the tile number
    font_family, font_size = "Arial", 14
+   # pre-rendered tile sprites keyed by (number, length, flash) and the canvas
+   # scale they were rendered for (the cache is emptied when the scale changes)
+   sprite_cache, sprite_scale = {}, None
 
    # A constructor that creates a tile with 2 as the number on it
    def __init__(self, number=2):
@@ -17,31 +38,46 @@ class Tile:
       self.set_colors()
       
    def set_colors(self):
-    color_map = {
-        2: Color(173, 216, 230),    # soft blue
-        4: Color(100, 149, 237),    # darker blue
-        8: Color(144, 238, 144),    # soft green
-        16: Color(60, 179, 113),    # green
-        32: Color(255, 223, 0),     # yellow
-        64: Color(255, 165, 0),     # orange
-        128: Color(255, 99, 71),    # likely orange
-        256: Color(255, 69, 0),     # bright red
-        512: Color(255, 0, 0),      # red
-        1024: Color(148, 0, 211),   # purple
-        2048: Color(75, 0, 130)     # purple + dark blue
-    }
-    self.background_color = color_map.get(self.number, Color(60, 58, 50))
+    self.background_color = TILE_COLORS.get(self.number, DEFAULT_TILE_COLOR)
     self.foreground_color = Color(0, 0, 0)
     self.box_color = Color(50, 50, 50)
 
+   # A method that returns the pixel rectangle covered by a tile drawn at a
+   # given position with a given length (as computed by stddraw.filledSquare)
+   @staticmethod
+   def get_pixel_rect(position, length):
+      r = length / 2
+      width, height = stddraw._factorX(2 * r), stddraw._factorY(2 * r)
+      return pygame.Rect(stddraw._scaleX(position.x - r),
+                         stddraw._scaleY(position.y - r) - height, width, height)
 
    # A method for drawing this tile at a given position with a given length
-   def draw(self, position, length=1):
-    #  everytime update colorss
+   # (each number, length and flash state is rendered once as a sprite, later
+   # draws only copy the sprite onto the canvas)
+   def draw(self, position, length=1, flash=False):
+    scale = (stddraw._surface.get_size(), stddraw._factorX(1), stddraw._factorY(1))
+    if Tile.sprite_scale != scale:
+       Tile.sprite_cache.clear()
+       Tile.sprite_scale = scale
+
+    rect = Tile.get_pixel_rect(position, length)
+    key = (self.number, length, flash)
+    sprite = Tile.sprite_cache.get(key)
+    if sprite is not None:
+       stddraw._surface.blit(sprite, rect.topleft)
+       return
+
+    self.render(position, length, flash)
+    # cache the rendered tile when it lies completely on the canvas
+    if stddraw._surface.get_rect().contains(rect):
+       Tile.sprite_cache[key] = stddraw._surface.subsurface(rect).copy()
+
+   # A method for rendering this tile with stddraw at a given position
+   def render(self, position, length=1, flash=False):
+    #  update the colors in case the number has changed
     self.set_colors()
 
-    # after draw
-    stddraw.setPenColor(self.background_color)
+    stddraw.setPenColor(FLASH_COLOR if flash else self.background_color)
     stddraw.filledSquare(position.x, position.y, length / 2)
     
     stddraw.setPenColor(self.box_color)